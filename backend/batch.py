@@ -0,0 +1,167 @@
+"""
+Ingestion par lots (import de bookmarks) : pipeline fetch → extraction → Gemini
+à concurrence bornée, écritures DB regroupées en inserts multi-lignes et
+résultats renvoyés au fil de l'eau en NDJSON
+"""
+import asyncio
+import json
+import os
+from typing import AsyncIterator
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlmodel import Session
+
+import crud
+import embeddings
+import ingest
+import metrics
+import models
+import response_cache
+import urls
+from database import engine
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "16"))
+# Les liens créés sont insérés par paquets de N (ou après un court délai)
+BATCH_FLUSH_SIZE = int(os.getenv("BATCH_FLUSH_SIZE", "50"))
+BATCH_FLUSH_INTERVAL = float(os.getenv("BATCH_FLUSH_INTERVAL", "1"))
+
+_DONE = object()
+
+
+async def iter_ndjson(body: bytes) -> AsyncIterator[tuple[int, object]]:
+    """Parse le NDJSON ligne par ligne, au rythme où le pipeline consomme les liens"""
+    index = 0
+    for line in body.splitlines():
+        if line.strip():
+            yield index, _parse_line(line)
+            index += 1
+
+
+def _parse_line(line: bytes) -> object:
+    try:
+        return json.loads(line)
+    except json.JSONDecodeError as e:
+        return e
+
+
+async def iter_items(items: list) -> AsyncIterator[tuple[int, object]]:
+    for index, raw in enumerate(items):
+        yield index, raw
+
+
+def insert_links(links: list[models.Link]) -> list[tuple[models.Link, bool]]:
+    # expire_on_commit=False : les ids viennent du RETURNING, pas besoin de recharger chaque ligne
+    with metrics.span("db_insert", links=len(links)), Session(engine, expire_on_commit=False) as session:
+        saved = crud.create_links(session, links)
+    created = [link for link, was_created in saved if was_created]
+    if created:
+        response_cache.cache.invalidate(response_cache.LIST_TAG)
+        embeddings.index.index_links_safely([(link.id, embeddings.link_text(link)) for link in created])
+    return saved
+
+
+def _result(index: int, url: str | None, status: str, link: models.Link | None = None, error: str | None = None, **extra) -> dict:
+    return {
+        "index": index,
+        "url": url,
+        "status": status,  # created | duplicate | failed | invalid
+        "link": models.LinkRead.model_validate(link).model_dump(mode="json") if link is not None else None,
+        "error": error,
+        **extra,
+    }
+
+
+async def ingest_batch(items: AsyncIterator[tuple[int, object]], concurrency: int) -> AsyncIterator[bytes]:
+    """Traite les liens avec `concurrency` workers et produit une ligne NDJSON par lien"""
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+    todo: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    to_insert: asyncio.Queue = asyncio.Queue()
+    results: asyncio.Queue = asyncio.Queue()
+    seen: dict[str, int] = {}  # URL canonique -> index de la première occurrence dans le lot
+    batch_id = metrics.new_correlation_id("batch")
+
+    async def produce():
+        async for index, raw in items:
+            await todo.put((index, raw))
+        for _ in range(concurrency):
+            await todo.put(_DONE)
+
+    async def work():
+        while (item := await todo.get()) is not _DONE:
+            index, raw = item
+            # Chaque worker a son propre contexte : l'id suit le lien en cours jusqu'au threadpool
+            metrics.correlation_id.set(f"{batch_id}-{index}")
+            url = raw.get("url") if isinstance(raw, dict) else None
+            try:
+                if isinstance(raw, Exception):
+                    raise ValueError(f"Invalid JSON: {raw}")
+                link = models.LinkCreate.model_validate(raw)
+                canonical_url = urls.normalize_url(link.url)
+            except (ValidationError, ValueError) as e:
+                await results.put(_result(index, url, "invalid", error=str(e)))
+                continue
+
+            if canonical_url in seen:
+                await results.put(_result(index, link.url, "duplicate", duplicate_of=seen[canonical_url]))
+                continue
+            seen[canonical_url] = index
+
+            try:
+                existing = await run_in_threadpool(ingest.find_link_by_canonical_url, canonical_url)
+                if existing is not None:
+                    await results.put(_result(index, link.url, "duplicate", existing))
+                    continue
+                db_link = await ingest.build_link(link)
+            except Exception as e:
+                await results.put(_result(index, link.url, "failed", error=str(e)))
+                continue
+
+            if db_link.id is not None:
+                await results.put(_result(index, link.url, "duplicate", db_link))
+            else:
+                await to_insert.put((index, db_link))
+
+    async def write():
+        """Regroupe les liens créés et les insère en un seul INSERT multi-lignes"""
+        finished = False
+        while not finished:
+            pending = []
+            item = await to_insert.get()
+            while item is not _DONE:
+                pending.append(item)
+                if len(pending) >= BATCH_FLUSH_SIZE:
+                    break
+                try:
+                    item = await asyncio.wait_for(to_insert.get(), timeout=BATCH_FLUSH_INTERVAL)
+                except asyncio.TimeoutError:
+                    break
+            finished = item is _DONE
+
+            if pending:
+                try:
+                    saved = await run_in_threadpool(insert_links, [link for _, link in pending])
+                    for (index, _), (link, created) in zip(pending, saved):
+                        await results.put(_result(index, link.url, "created" if created else "duplicate", link))
+                except Exception as e:
+                    for index, link in pending:
+                        await results.put(_result(index, link.url, "failed", error=f"Database error: {e}"))
+        await results.put(_DONE)
+
+    async def run():
+        writer = asyncio.create_task(write())
+        try:
+            await asyncio.gather(produce(), *(work() for _ in range(concurrency)))
+        finally:
+            await to_insert.put(_DONE)
+            await writer
+
+    runner = asyncio.create_task(run())
+    try:
+        while (result := await results.get()) is not _DONE:
+            yield (json.dumps(result) + "\n").encode()
+        await runner
+    finally:
+        # Client déconnecté : on arrête le pipeline
+        runner.cancel()
@@ -0,0 +1,122 @@
+"""
+Benchmark des moteurs d'extraction sur un corpus de pages enregistrées.
+
+    cd backend
+    python -m bench.extract                       # corpus bench/pages/
+    python -m bench.extract ~/saved-pages -n 50 --json extract.json
+
+Compare chaque moteur à l'ancienne implémentation BeautifulSoup (moteur "bs4") :
+débit, temps moyen par page et concordance du titre / de la description / du texte.
+"""
+import argparse
+import difflib
+import json
+import time
+from pathlib import Path
+
+import extraction
+
+DEFAULT_CORPUS = Path(__file__).parent / "pages"
+# Documents dégénérés : aucun moteur ne doit lever, tous (hors référence bs4) doivent rendre le même texte
+EDGE_CASES = {
+    "empty": b"",
+    "whitespace": b" \n\t ",
+    "comment_only": b"<!-- rien -->",
+    "bom": "\ufeff<p>été</p>".encode("utf-8"),
+    "bom_str": "\ufeff<p>été</p>",
+}
+
+
+def load_corpus(directory: Path) -> dict[str, bytes]:
+    pages = {path.name: path.read_bytes() for path in sorted(directory.glob("*.htm*"))}
+    if not pages:
+        raise SystemExit(f"No .html files in {directory}")
+    return pages
+
+
+def time_engine(engine: str, pages: dict[str, bytes], iterations: int) -> dict:
+    extract = extraction.ENGINES[engine]
+    per_page = {}
+    for name, html_content in pages.items():
+        extract(html_content)  # warm-up
+        started = time.perf_counter()
+        for _ in range(iterations):
+            extract(html_content)
+        per_page[name] = (time.perf_counter() - started) / iterations
+
+    total_seconds = sum(per_page.values())
+    total_bytes = sum(len(html_content) for html_content in pages.values())
+    return {
+        "engine": engine,
+        "pages_per_second": len(pages) / total_seconds,
+        "mb_per_second": total_bytes / total_seconds / 1e6,
+        "mean_ms_per_page": total_seconds / len(pages) * 1000,
+        "per_page_ms": {name: seconds * 1000 for name, seconds in per_page.items()},
+    }
+
+
+def check_edge_cases():
+    for name, html_content in EDGE_CASES.items():
+        texts = {
+            engine: extract(html_content).text
+            for engine, extract in extraction.ENGINES.items() if engine != "bs4"
+        }
+        if len(set(texts.values())) != 1:
+            raise SystemExit(f"Edge case {name!r}: engines disagree {texts}")
+
+
+def agreement(engine: str, pages: dict[str, bytes]) -> dict:
+    """Concordance avec la référence bs4 (1.0 = identique)"""
+    titles = descriptions = 0
+    text_ratios = []
+    for html_content in pages.values():
+        reference = extraction.extract_bs4(html_content)
+        result = extraction.ENGINES[engine](html_content)
+        titles += (reference.title or "").split() == (result.title or "").split()
+        descriptions += (reference.description or "") == (result.description or "")
+        # Ignore les espaces : bs4 colle les blocs adjacents ("TitrePara"), pas les nouveaux moteurs
+        text_ratios.append(difflib.SequenceMatcher(
+            None, reference.text.replace(" ", ""), result.text.replace(" ", "")
+        ).ratio())
+    return {
+        "title": titles / len(pages),
+        "description": descriptions / len(pages),
+        "text_similarity": sum(text_ratios) / len(text_ratios),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("-n", "--iterations", type=int, default=20)
+    parser.add_argument("--json", type=Path, help="Écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    check_edge_cases()
+    pages = load_corpus(args.corpus)
+    print(f"Corpus: {len(pages)} pages, {sum(map(len, pages.values())) / 1e6:.2f} MB, {args.iterations} iterations\n")
+
+    results = []
+    for engine in extraction.ENGINES:
+        result = time_engine(engine, pages, args.iterations)
+        result["agreement_with_bs4"] = agreement(engine, pages)
+        results.append(result)
+
+    baseline = next(r for r in results if r["engine"] == "bs4")
+    print(f"{'engine':<8} {'pages/s':>9} {'MB/s':>7} {'ms/page':>8} {'speedup':>8} {'title':>6} {'text':>6}")
+    for r in results:
+        speedup = baseline["mean_ms_per_page"] / r["mean_ms_per_page"]
+        r["speedup_vs_bs4"] = speedup
+        print(
+            f"{r['engine']:<8} {r['pages_per_second']:>9.1f} {r['mb_per_second']:>7.2f} "
+            f"{r['mean_ms_per_page']:>8.2f} {speedup:>7.1f}x "
+            f"{r['agreement_with_bs4']['title']:>6.0%} {r['agreement_with_bs4']['text_similarity']:>6.0%}"
+        )
+
+    if args.json:
+        args.json.write_text(json.dumps({"benchmark": "extraction", "results": results}, indent=2))
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Environnement des benchmarks : base jetable, serveur HTTP local qui sert les pages
+enregistrées, LLM factice à la place de Gemini et application FastAPI en process.
+
+Doit être importé avant tout module de l'application : DATABASE_URL est fixé ici.
+"""
+import json
+import os
+import re
+import statistics
+import tempfile
+import threading
+import time
+from contextlib import asynccontextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# SQLite jetable par défaut ; BENCH_DATABASE_URL=postgresql://... pour une base locale.
+# Le répertoire est supprimé à la sortie du process (finaliseur de TemporaryDirectory)
+_DATABASE_DIR = None
+if not os.getenv("BENCH_DATABASE_URL"):
+    _DATABASE_DIR = tempfile.TemporaryDirectory(prefix="ingester-bench-")
+os.environ["DATABASE_URL"] = os.getenv("BENCH_DATABASE_URL") or (
+    "sqlite:///" + os.path.join(_DATABASE_DIR.name, "bench.db")
+)
+
+# Les logs JSON par ingestion noieraient la sortie du benchmark
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+PAGES_DIR = Path(__file__).parent / "pages"
+_CANONICAL = re.compile(rb"<link[^>]+rel=[\"']?canonical[^>]*>", re.IGNORECASE)
+
+
+def load_pages(directory: Path = PAGES_DIR) -> dict[str, bytes]:
+    pages = {path.name: path.read_bytes() for path in sorted(directory.glob("*.htm*"))}
+    if not pages:
+        raise SystemExit(f"No .html files in {directory}")
+    return pages
+
+
+class FixtureServer:
+    """Sert /<n>/<page> : chaque n donne une URL distincte (pas de dédoublonnage entre requêtes)"""
+
+    def __init__(self, pages: dict[str, bytes], latency: float = 0.0):
+        # Sans <link rel=canonical>, sinon toutes les variantes d'une page seraient des doublons
+        self.pages = {name: _CANONICAL.sub(b"", content) for name, content in pages.items()}
+        self.latency = latency
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                name = self.path.rsplit("/", 1)[-1]
+                content = server.pages.get(name)
+                if server.latency:
+                    time.sleep(server.latency)
+                if content is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}"
+
+    def url(self, n: int) -> str:
+        names = sorted(self.pages)
+        return f"{self.base_url}/{n}/{names[n % len(names)]}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class StubLLM:
+    """Remplace llm.client.generate : latence fixe, réponse JSON valide, aucun quota"""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str, model_name: str = "") -> str:
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        return json.dumps({"title": "Bench title", "description": "Bench description", "tags": ["bench", "web"]})
+
+
+@asynccontextmanager
+async def running_app(llm_latency: float, llm_cache: bool = False, response_cache: bool = False):
+    """Application FastAPI démarrée en process (workers compris), sans Chromium ni Gemini"""
+    import browser
+    import llm
+    import llm_cache as llm_cache_module
+    import main
+    import migrate
+    import response_cache as response_cache_module
+
+    stub = StubLLM(llm_latency)
+    llm.client.generate = stub.generate
+    if not llm_cache:
+        # Pages répétées : sans ça tout sauf le premier passage serait un hit du cache LLM
+        llm_cache_module.cache.get = lambda key: None
+    response_cache_module.cache.enabled = response_cache
+
+    async def no_browser():
+        pass
+
+    browser.manager.start = no_browser
+    migrate.upgrade()
+    await main.on_startup()
+    try:
+        yield main.app, stub
+    finally:
+        await main.on_shutdown()
+
+
+def summarize(samples: list[float]) -> dict:
+    """Percentiles en millisecondes"""
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def write_json(path: Path | None, benchmark: str, results: dict):
+    if path:
+        payload = {
+            "benchmark": benchmark,
+            "database": os.environ["DATABASE_URL"].split("://", 1)[0],
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "results": results,
+        }
+        path.write_text(json.dumps(payload, indent=2))
+        print(f"\nResults written to {path}")
@@ -0,0 +1,103 @@
+"""
+Latence de bout en bout de POST /ingest/ (soumission → job "done") sous N clients concurrents,
+contre le serveur de pages local et un LLM factice.
+
+    cd backend
+    python -m bench.ingest                               # 200 liens, 8 clients, SQLite jetable
+    python -m bench.ingest -n 500 -c 32 --workers 8 --llm-latency 0.5 --json ingest.json
+    BENCH_DATABASE_URL=postgresql://localhost/bench python -m bench.ingest
+"""
+import argparse
+import asyncio
+import os
+import time
+from pathlib import Path
+
+from bench import fixtures
+
+POLL_INTERVAL = 0.02
+
+
+async def ingest_one(client, url: str, timeout: float) -> tuple[float, str, float]:
+    """(durée soumission → fin du job, statut, durée de la réponse 202)"""
+    started = time.perf_counter()
+    response = await client.post("/ingest/", json={"url": url, "source": "bench", "resource_type": "article"})
+    response.raise_for_status()
+    job = response.json()
+    submitted = time.perf_counter() - started
+    deadline = started + timeout
+    while job["status"] not in ("done", "failed"):
+        if time.perf_counter() > deadline:
+            return time.perf_counter() - started, "timeout", submitted
+        await asyncio.sleep(POLL_INTERVAL)
+        job = (await client.get(f"/jobs/{job['id']}")).json()
+    return time.perf_counter() - started, job["status"], submitted
+
+
+async def run(links: int, clients: int, llm_latency: float, fetch_latency: float, timeout: float) -> dict:
+    import httpx
+
+    with fixtures.FixtureServer(fixtures.load_pages(), latency=fetch_latency) as server:
+        async with fixtures.running_app(llm_latency) as (app, stub):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+                queue: asyncio.Queue = asyncio.Queue()
+                for n in range(links):
+                    queue.put_nowait(server.url(n))
+                latencies, submit_latencies, statuses = [], [], {}
+
+                async def client_loop():
+                    while not queue.empty():
+                        url = queue.get_nowait()
+                        elapsed, status, submitted = await ingest_one(client, url, timeout)
+                        statuses[status] = statuses.get(status, 0) + 1
+                        if status == "done":
+                            latencies.append(elapsed)
+                        submit_latencies.append(submitted)
+
+                started = time.perf_counter()
+                await asyncio.gather(*(client_loop() for _ in range(clients)))
+                wall = time.perf_counter() - started
+
+    return {
+        "links": links,
+        "clients": clients,
+        "workers": int(os.environ["INGEST_WORKERS"]),
+        "llm_latency_s": llm_latency,
+        "fetch_latency_s": fetch_latency,
+        "llm_calls": stub.calls,
+        "statuses": statuses,
+        "throughput_links_per_s": links / wall,
+        "wall_seconds": wall,
+        "submit": fixtures.summarize(submit_latencies),
+        "end_to_end": fixtures.summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", "--links", type=int, default=200)
+    parser.add_argument("-c", "--clients", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=int(os.getenv("INGEST_WORKERS", "4")))
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Latence simulée d'un appel Gemini (s)")
+    parser.add_argument("--fetch-latency", type=float, default=0.0, help="Latence ajoutée par le serveur de pages (s)")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--json", type=Path, help="Écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    # Lu à l'import de jobs.py, donc avant le démarrage de l'application
+    os.environ["INGEST_WORKERS"] = str(args.workers)
+    result = asyncio.run(run(args.links, args.clients, args.llm_latency, args.fetch_latency, args.timeout))
+
+    print(f"{result['links']} links, {result['clients']} clients, {result['workers']} workers: "
+          f"{result['throughput_links_per_s']:.1f} links/s, statuses {result['statuses']}")
+    for name in ("submit", "end_to_end"):
+        stats = result[name]
+        if stats["count"]:
+            print(f"{name:<11} p50 {stats['p50_ms']:8.1f} ms  p90 {stats['p90_ms']:8.1f} ms  "
+                  f"p99 {stats['p99_ms']:8.1f} ms  max {stats['max_ms']:8.1f} ms")
+    fixtures.write_json(args.json, "ingest", result)
+
+
+if __name__ == "__main__":
+    main()
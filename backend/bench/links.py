@@ -0,0 +1,132 @@
+"""
+Latence de GET /links/ selon la taille de la table : première page, page profonde
+par curseur et par offset, filtre, projection `fields=`, et revalidation ETag (304).
+
+    cd backend
+    python -m bench.links                                 # tailles 1000, 10000, 50000
+    python -m bench.links --sizes 1000 100000 -r 200 --json links.json
+    BENCH_DATABASE_URL=postgresql://localhost/bench python -m bench.links
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from bench import fixtures
+
+SEED_CHUNK = 5000
+PAGE_SIZE = 50
+
+
+def seed(engine, start: int, count: int):
+    """Insère `count` liens par INSERT multi-lignes (created_at croissant, types et sources variés)"""
+    from sqlmodel import Session
+
+    import models
+
+    base = datetime(2024, 1, 1)
+    for offset in range(0, count, SEED_CHUNK):
+        with Session(engine) as session:
+            session.add_all([
+                models.Link(
+                    url=f"https://bench.example.com/{n}",
+                    canonical_url=f"https://bench.example.com/{n}",
+                    title=f"Bench link {n}",
+                    description="Seeded for bench.links",
+                    tags=["bench", f"tag{n % 20}"],
+                    content="lorem ipsum " * 50,
+                    source="bench" if n % 3 else "discord",
+                    resource_type="resource" if n % 4 == 0 else "article",
+                    created_at=base + timedelta(seconds=n),
+                    read=n % 2 == 0,
+                )
+                for n in range(start + offset, start + min(offset + SEED_CHUNK, count))
+            ])
+            session.commit()
+
+
+async def measure(client, path: str, repeat: int, headers: dict | None = None) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        samples.append(time.perf_counter() - started)
+        if response.status_code not in (200, 304):
+            raise RuntimeError(f"{path}: HTTP {response.status_code}")
+    return fixtures.summarize(samples)
+
+
+async def deep_cursor(client, pages: int) -> str:
+    """Curseur de la page `pages` (obtenu en suivant X-Next-Cursor)"""
+    cursor = None
+    for _ in range(pages):
+        path = f"/links/?limit={PAGE_SIZE}&fields=id" + (f"&cursor={cursor}" if cursor else "")
+        cursor = (await client.get(path)).headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    return cursor
+
+
+async def run(sizes: list[int], repeat: int) -> dict:
+    import httpx
+
+    from database import engine
+    import response_cache
+
+    results = {}
+    async with fixtures.running_app(llm_latency=0) as (app, _):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            seeded = 0
+            for size in sorted(sizes):
+                started = time.perf_counter()
+                await asyncio.to_thread(seed, engine, seeded, size - seeded)
+                seed_seconds = time.perf_counter() - started
+                seeded = size
+
+                # Mesures DB : cache de réponses coupé
+                response_cache.cache.enabled = False
+                depth = max(1, min(size // PAGE_SIZE - 1, 200))
+                cursor = await deep_cursor(client, depth)
+                scenarios = {
+                    "first_page": f"/links/?limit={PAGE_SIZE}",
+                    "first_page_fields": f"/links/?limit={PAGE_SIZE}&fields=id,title,url",
+                    "filtered": f"/links/?limit={PAGE_SIZE}&resource_type=resource&read=false",
+                    f"offset_page_{depth}": f"/links/?limit={PAGE_SIZE}&skip={depth * PAGE_SIZE}",
+                }
+                if cursor:
+                    scenarios[f"cursor_page_{depth}"] = f"/links/?limit={PAGE_SIZE}&cursor={cursor}"
+                result = {"seed_seconds": seed_seconds}
+                for name, path in scenarios.items():
+                    result[name] = await measure(client, path, repeat)
+
+                # Revalidation : réponse en cache, le client renvoie son ETag
+                response_cache.cache.enabled = True
+                first = await client.get(f"/links/?limit={PAGE_SIZE}")
+                result["etag_304"] = await measure(
+                    client, f"/links/?limit={PAGE_SIZE}", repeat, headers={"If-None-Match": first.headers["etag"]}
+                )
+                results[str(size)] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("-r", "--repeat", type=int, default=100)
+    parser.add_argument("--json", type=Path, help="Écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.sizes, args.repeat))
+
+    print(f"{'rows':>8} {'scenario':<22} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8}")
+    for size, result in results.items():
+        for name, stats in result.items():
+            if isinstance(stats, dict):
+                print(f"{size:>8} {name:<22} {stats['p50_ms']:>8.2f} {stats['p90_ms']:>8.2f} {stats['p99_ms']:>8.2f}")
+    fixtures.write_json(args.json, "links", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Temps de démarrage à froid du backend, en API complète et en lecture seule (READ_ONLY) :
+chaque essai lance un process neuf qui importe main puis exécute le startup.
+
+    cd backend
+    python -m bench.startup                       # 5 essais par mode
+    python -m bench.startup -r 10 --json startup.json
+    python -m bench.startup --modes read_only
+
+Relève aussi les bibliothèques lourdes chargées au démarrage (SDK Gemini, Playwright,
+BeautifulSoup...) : en lecture seule, aucune ne doit apparaître.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+from bench import fixtures
+
+HEAVY_MODULES = ["google.generativeai", "google.api_core", "playwright", "bs4", "sentence_transformers", "torch"]
+
+# Exécuté dans le process enfant : imports, startup, puis shutdown
+CHILD = """
+import asyncio, json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+async def cycle():
+    await main.on_startup()
+    ready = time.perf_counter()
+    await main.on_shutdown()
+    return ready
+
+ready = asyncio.run(cycle())
+import metrics
+print(json.dumps({
+    "import_seconds": imported - started,
+    "ready_seconds": ready - started,
+    "phases": metrics.startup.get_stats(),
+    "heavy_modules": [name for name in %r if name in sys.modules],
+}))
+"""
+
+MODES = {
+    # Lancement de Chromium compris (phase "browser")
+    "full": {"READ_ONLY": "false"},
+    "read_only": {"READ_ONLY": "true"},
+}
+
+
+def run_once(mode: str) -> dict:
+    env = {**os.environ, **MODES[mode], "REFRESH_ENABLED": "false"}
+    started = time.perf_counter()
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD % HEAVY_MODULES],
+        cwd=Path(__file__).resolve().parent.parent, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{mode}: startup failed\n{completed.stderr}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = time.perf_counter() - started
+    return result
+
+
+def run(modes: list[str], repeat: int) -> dict:
+    import migrate
+
+    migrate.upgrade()
+    results = {}
+    for mode in modes:
+        runs = [run_once(mode) for _ in range(repeat)]
+        results[mode] = {
+            "process": fixtures.summarize([r["process_seconds"] for r in runs]),
+            "imports": fixtures.summarize([r["import_seconds"] for r in runs]),
+            "ready": fixtures.summarize([r["ready_seconds"] for r in runs]),
+            "phases": runs[-1]["phases"],
+            "heavy_modules": runs[-1]["heavy_modules"],
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("-r", "--repeat", type=int, default=5)
+    parser.add_argument("--json", type=Path, help="Écrit les résultats dans ce fichier")
+    args = parser.parse_args()
+
+    results = run(args.modes, args.repeat)
+
+    print(f"{'mode':<10} {'measure':<10} {'p50 ms':>8} {'p90 ms':>8}")
+    for mode, result in results.items():
+        for name in ("process", "imports", "ready"):
+            stats = result[name]
+            print(f"{mode:<10} {name:<10} {stats['p50_ms']:>8.1f} {stats['p90_ms']:>8.1f}")
+        print(f"{mode:<10} heavy modules loaded: {', '.join(result['heavy_modules']) or 'none'}")
+    fixtures.write_json(args.json, "startup", results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Navigateur Chromium partagé : lancé une fois au démarrage, il distribue des
+contextes isolés depuis un pool borné au lieu de lancer Chromium à chaque URL
+"""
+import asyncio
+import logging
+import os
+import time
+from urllib.parse import urlparse
+
+import metrics
+
+PLAYWRIGHT_POOL_SIZE = int(os.getenv("PLAYWRIGHT_POOL_SIZE", "3"))
+# Un contexte est recyclé après N pages ou quand son heap JS dépasse la limite
+PLAYWRIGHT_MAX_PAGES_PER_CONTEXT = int(os.getenv("PLAYWRIGHT_MAX_PAGES_PER_CONTEXT", "25"))
+PLAYWRIGHT_MAX_CONTEXT_HEAP_MB = int(os.getenv("PLAYWRIGHT_MAX_CONTEXT_HEAP_MB", "256"))
+PLAYWRIGHT_NAV_TIMEOUT_MS = int(os.getenv("PLAYWRIGHT_NAV_TIMEOUT_MS", "30000"))
+PLAYWRIGHT_READY_TIMEOUT_MS = int(os.getenv("PLAYWRIGHT_READY_TIMEOUT_MS", "8000"))
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+# Sélecteur qui indique que le contenu est rendu ; sinon on attend le network-idle
+READY_SELECTORS = {
+    "twitter.com": "article",
+    "x.com": "article",
+    "instagram.com": "main article, main img",
+}
+
+
+def ready_selector_for(url: str) -> str | None:
+    host = (urlparse(url).hostname or "").lower()
+    for domain, selector in READY_SELECTORS.items():
+        if host == domain or host.endswith("." + domain):
+            return selector
+    return None
+
+
+class _PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.pages = 0
+        self.heap_bytes = 0
+
+
+class BrowserManager:
+    """Pool borné de contextes Chromium partagés par tous les workers d'ingestion"""
+
+    def __init__(self, pool_size: int):
+        self.pool_size = pool_size
+        self._playwright = None
+        self._browser = None
+        self._idle: list[_PooledContext] = []
+        self._slots: asyncio.Semaphore | None = None
+        self._launch_lock: asyncio.Lock | None = None
+        self._in_use = 0
+        self._waiting = 0
+        self._stats = {
+            "renders": 0,
+            "render_failures": 0,
+            "browser_launches": 0,
+            "contexts_created": 0,
+            "contexts_recycled": 0,
+            "acquires": 0,
+            "saturated_acquires": 0,  # acquisitions qui ont dû attendre un contexte libre
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+            "peak_waiting": 0,
+        }
+
+    async def start(self):
+        self._slots = asyncio.Semaphore(self.pool_size)
+        self._launch_lock = asyncio.Lock()
+        try:
+            await self._ensure_browser()
+        except Exception as e:
+            # Pas bloquant : le navigateur sera relancé à la première demande de rendu
+            metrics.log("browser_start_failed", level=logging.WARNING, error=repr(e))
+
+    async def stop(self):
+        for pooled in self._idle:
+            await self._close_context(pooled, recycled=False)
+        self._idle = []
+        if self._browser is not None:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def _ensure_browser(self):
+        async with self._launch_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return
+            # Navigateur crashé : ses contextes sont inutilisables
+            self._idle = []
+            if self._playwright is None:
+                # Importé au premier lancement : un process en lecture seule ne charge jamais Playwright
+                from playwright.async_api import async_playwright
+
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=True)
+            self._stats["browser_launches"] += 1
+            metrics.log("browser_launched", launches=self._stats["browser_launches"])
+
+    async def _acquire(self) -> _PooledContext:
+        started = time.perf_counter()
+        saturated = self._slots.locked()
+        self._waiting += 1
+        self._stats["peak_waiting"] = max(self._stats["peak_waiting"], self._waiting)
+        try:
+            await self._slots.acquire()
+        finally:
+            self._waiting -= 1
+
+        waited = time.perf_counter() - started
+        self._stats["acquires"] += 1
+        self._stats["saturated_acquires"] += int(saturated)
+        self._stats["wait_seconds_total"] += waited
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+        self._in_use += 1
+
+        try:
+            await self._ensure_browser()
+            if self._idle:
+                return self._idle.pop()
+            context = await self._browser.new_context(user_agent=USER_AGENT)
+            self._stats["contexts_created"] += 1
+            return _PooledContext(context)
+        except Exception:
+            self._release_slot()
+            raise
+
+    async def _release(self, pooled: _PooledContext, healthy: bool):
+        try:
+            heap_limit = PLAYWRIGHT_MAX_CONTEXT_HEAP_MB * 1024 * 1024
+            if not healthy or pooled.pages >= PLAYWRIGHT_MAX_PAGES_PER_CONTEXT or pooled.heap_bytes > heap_limit:
+                await self._close_context(pooled, recycled=True)
+            else:
+                self._idle.append(pooled)
+        finally:
+            self._release_slot()
+
+    def _release_slot(self):
+        self._in_use -= 1
+        self._slots.release()
+
+    async def _close_context(self, pooled: _PooledContext, recycled: bool):
+        try:
+            await pooled.context.close()
+        except Exception as e:
+            metrics.log("browser_context_close_failed", level=logging.WARNING, error=repr(e))
+        if recycled:
+            self._stats["contexts_recycled"] += 1
+
+    async def render(self, url: str, wait_selector: str | None = None) -> str | None:
+        """Rend une page dynamique et retourne son HTML (None si le rendu échoue)"""
+        if self._slots is None:
+            await self.start()
+        selector = wait_selector or ready_selector_for(url)
+        from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+        try:
+            pooled = await self._acquire()
+        except Exception as e:
+            self._stats["render_failures"] += 1
+            metrics.log("render_failed", level=logging.WARNING, url=url, stage="acquire", error=repr(e))
+            return None
+
+        healthy = True
+        page = None
+        try:
+            page = await pooled.context.new_page()
+            await page.goto(url, wait_until="domcontentloaded", timeout=PLAYWRIGHT_NAV_TIMEOUT_MS)
+            try:
+                if selector:
+                    await page.wait_for_selector(selector, timeout=PLAYWRIGHT_READY_TIMEOUT_MS)
+                else:
+                    await page.wait_for_load_state("networkidle", timeout=PLAYWRIGHT_READY_TIMEOUT_MS)
+            except PlaywrightTimeoutError:
+                # On garde ce qui est déjà rendu plutôt que d'échouer
+                metrics.log("render_not_ready", level=logging.WARNING, url=url, timeout_ms=PLAYWRIGHT_READY_TIMEOUT_MS)
+
+            html_content = await page.content()
+            pooled.heap_bytes = await page.evaluate(
+                "() => (performance.memory && performance.memory.usedJSHeapSize) || 0"
+            )
+            self._stats["renders"] += 1
+            return html_content
+        except Exception as e:
+            healthy = False
+            self._stats["render_failures"] += 1
+            metrics.log("render_failed", level=logging.WARNING, url=url, stage="page", error=repr(e))
+            return None
+        finally:
+            pooled.pages += 1
+            if page is not None:
+                try:
+                    await page.close()
+                except Exception:
+                    healthy = False
+            await self._release(pooled, healthy)
+
+    def get_stats(self) -> dict:
+        acquires = self._stats["acquires"]
+        return {
+            **self._stats,
+            "pool_size": self.pool_size,
+            "in_use": self._in_use,
+            "idle": len(self._idle),
+            "waiting": self._waiting,
+            "saturation": self._in_use / self.pool_size if self.pool_size else 0.0,
+            "wait_seconds_avg": self._stats["wait_seconds_total"] / acquires if acquires else 0.0,
+            "browser_connected": bool(self._browser and self._browser.is_connected()),
+        }
+
+
+manager = BrowserManager(pool_size=PLAYWRIGHT_POOL_SIZE)
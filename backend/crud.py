@@ -1,36 +1,566 @@
-from sqlmodel import Session, select
+from sqlmodel import Session, select, update, delete, func, or_
+from sqlmodel.ext.asyncio.session import AsyncSession
+import metrics
 import models
-from sqlalchemy import exc
+from sqlalchemy import bindparam, exc, insert, text, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from datetime import datetime, timedelta
+import base64
+import csv
+import io
+import json
+import logging
+from collections import Counter
 
-def create_link(session: Session, link: models.Link) -> models.Link:
+
+def create_links(session: Session, links: list[models.Link]) -> list[tuple[models.Link, bool]]:
+    """Insère plusieurs liens en un seul INSERT multi-lignes.
+    Retourne (lien, créé) ; si une URL canonique existe déjà, le lien existant est renvoyé."""
     try:
-        db_link = link
-        session.add(db_link)
+        session.add_all(links)
+        session.flush()
+        add_links_tags(session, [(link.id, link.tags) for link in links])
         session.commit()
-        session.refresh(db_link)
-        return db_link
-    except exc.OperationalError as e:
+        return [(link, True) for link in links]
+    except exc.IntegrityError:
         session.rollback()
-        print(f"Database connection error: {e}")
-        raise
+
+    # Conflit avec une ingestion concurrente : repli ligne à ligne
+    saved = []
+    for link in links:
+        try:
+            session.add(link)
+            session.flush()
+            set_link_tags(session, link.id, link.tags)
+            session.commit()
+            saved.append((link, True))
+        except exc.IntegrityError:
+            session.rollback()
+            existing = get_link_by_canonical_url(session, link.canonical_url)
+            if existing is None:
+                raise
+            saved.append((existing, False))
+    return saved
+
+
+def encode_cursor(created_at: datetime, link_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), link_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Lève ValueError si le curseur est invalide"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, link_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(link_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def _links_statement(
+    skip: int,
+    limit: int,
+    cursor: tuple[datetime, int] | None,
+    read: bool | None,
+    resource_type: str | None,
+    source: str | None,
+    fields: list[str] | None,
+    tags: list[str] | None = None,
+    tags_any: bool = False,
+):
+    if fields:
+        # id et created_at sont toujours lus : ils servent à construire le curseur suivant
+        columns = dict.fromkeys(["id", "created_at", *fields])
+        statement = select(*[getattr(models.Link, name) for name in columns])
+    else:
+        statement = select(models.Link)
+
+    if read is not None:
+        statement = statement.where(models.Link.read == read)
+    if resource_type is not None:
+        statement = statement.where(models.Link.resource_type == resource_type)
+    if source is not None:
+        statement = statement.where(models.Link.source == source)
+    if tags and tags_any:
+        statement = statement.where(models.Link.id.in_(_tag_link_ids(*tags)))
+    else:
+        for name in tags or []:
+            statement = statement.where(models.Link.id.in_(_tag_link_ids(name)))
+
+    if cursor is not None:
+        # Keyset : parcours de l'index ix_link_created_at_id, coût constant quelle que soit la page
+        statement = statement.where(tuple_(models.Link.created_at, models.Link.id) < tuple_(*cursor))
+    elif skip:
+        statement = statement.offset(skip)
+
+    return statement.order_by(models.Link.created_at.desc(), models.Link.id.desc()).limit(limit)
+
+
+def _canonical_url_statement(canonical_url: str):
+    return select(models.Link).where(models.Link.canonical_url == canonical_url)
+
+
+def get_link_by_canonical_url(session: Session, canonical_url: str) -> models.Link | None:
+    return session.exec(_canonical_url_statement(canonical_url)).first()
+
+
+def _new_job(link: models.LinkCreate, canonical_url: str, link_id: int | None) -> models.IngestJob:
+    return models.IngestJob(
+        url=link.url,
+        canonical_url=canonical_url,
+        payload=link.model_dump(),
+        status="done" if link_id is not None else "pending",
+        link_id=link_id,
+    )
+
+
+def _active_job_statement(canonical_url: str):
+    return (
+        select(models.IngestJob)
+        .where(models.IngestJob.canonical_url == canonical_url)
+        .where(models.IngestJob.status.in_(("pending", "running")))
+        .order_by(models.IngestJob.id)
+    )
+
+
+def claim_next_job(session: Session, lease: timedelta, max_attempts: int) -> models.IngestJob | None:
+    """Réserve le plus ancien job en attente (ou dont le worker a disparu).
+    Un job abandonné qui a déjà épuisé ses max_attempts (il fait tomber son worker) est passé en échec"""
+    now = datetime.utcnow()
+    claimable = or_(
+        models.IngestJob.status == "pending",
+        (models.IngestJob.status == "running") & (models.IngestJob.updated_at < now - lease),
+    )
+    while True:
+        job = session.exec(
+            select(models.IngestJob).where(claimable).order_by(models.IngestJob.id).limit(1)
+        ).first()
+        if job is None:
+            return None
+
+        if job.status == "running" and job.attempts >= max_attempts:
+            result = session.execute(
+                update(models.IngestJob)
+                .where(models.IngestJob.id == job.id, models.IngestJob.updated_at == job.updated_at)
+                .values(status="failed", error=f"Worker lost after {job.attempts} attempts", updated_at=now)
+            )
+            session.commit()
+            if result.rowcount == 1:
+                metrics.log("job_abandoned", level=logging.WARNING, job_id=job.id, url=job.url, attempts=job.attempts)
+            continue
+
+        # UPDATE conditionnel : un seul worker (ou process) gagne la réservation
+        result = session.execute(
+            update(models.IngestJob)
+            .where(models.IngestJob.id == job.id, models.IngestJob.updated_at == job.updated_at)
+            .where(claimable)
+            .values(status="running", attempts=job.attempts + 1, updated_at=now)
+        )
+        session.commit()
+        if result.rowcount == 1:
+            session.refresh(job)
+            return job
+
+
+def complete_job(session: Session, job_id: int, link: models.Link) -> tuple[models.IngestJob, bool]:
+    """Insère le lien (sauf s'il existe déjà) et marque le job comme terminé dans la même transaction.
+    Retourne (job, créé) : créé est faux si le lien existait, ou si une insertion concurrente l'a devancé"""
+    job = session.get(models.IngestJob, job_id)
+    created = False
+    try:
+        if link.id is None:
+            session.add(link)
+            session.flush()
+            set_link_tags(session, link.id, link.tags)
+            created = True
+        link_id = link.id
+    except exc.IntegrityError:
+        # Un autre job a inséré la même URL canonique entre-temps
+        session.rollback()
+        existing = get_link_by_canonical_url(session, link.canonical_url)
+        if existing is None:
+            raise
+        job = session.get(models.IngestJob, job_id)
+        link_id = existing.id
+        created = False
+
+    try:
+        job.status = "done"
+        job.link_id = link_id
+        job.error = None
+        job.updated_at = datetime.utcnow()
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job, created
     except Exception as e:
         session.rollback()
-        print(f"Error creating link: {e}")
+        metrics.log("job_complete_failed", level=logging.ERROR, job_id=job_id, error=repr(e))
         raise
 
 
-def get_links(session: Session, skip: int = 0, limit: int = 100) -> list[models.Link]:
-    return session.exec(select(models.Link).offset(skip).limit(limit)).all()
+def fail_job(session: Session, job_id: int, error: str, retry: bool) -> models.IngestJob:
+    job = session.get(models.IngestJob, job_id)
+    job.status = "pending" if retry else "failed"
+    job.error = error
+    job.updated_at = datetime.utcnow()
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def get_fetch_cache(session: Session, url: str) -> models.FetchCache | None:
+    return session.get(models.FetchCache, url)
+
+
+def save_fetch_cache(session: Session, entry: models.FetchCache) -> None:
+    session.merge(entry)
+    session.commit()
+
+
+def evict_fetch_cache(session: Session, expired_before: datetime, max_entries: int) -> int:
+    """Supprime les entrées expirées puis les plus anciennes au-delà de max_entries"""
+    deleted = session.execute(
+        delete(models.FetchCache).where(models.FetchCache.fetched_at < expired_before)
+    ).rowcount
+    overflow = session.exec(select(func.count()).select_from(models.FetchCache)).one() - max_entries
+    if overflow > 0:
+        oldest = select(models.FetchCache.url).order_by(models.FetchCache.fetched_at).limit(overflow)
+        deleted += session.execute(
+            delete(models.FetchCache).where(models.FetchCache.url.in_(oldest))
+        ).rowcount
+    session.commit()
+    return deleted
+
+
+def get_llm_cache_entry(session: Session, key: str) -> models.LLMCacheEntry | None:
+    return session.get(models.LLMCacheEntry, key)
+
+
+def touch_llm_cache_entry(session: Session, entry: models.LLMCacheEntry) -> None:
+    entry.hits += 1
+    entry.last_used_at = datetime.utcnow()
+    session.add(entry)
+    session.commit()
+
+
+def save_llm_cache_entry(session: Session, entry: models.LLMCacheEntry) -> None:
+    session.merge(entry)
+    session.commit()
+
+
+def evict_llm_cache(session: Session, expired_before: datetime, max_entries: int) -> int:
+    """Supprime les entrées expirées puis les moins récemment utilisées au-delà de max_entries"""
+    deleted = session.execute(
+        delete(models.LLMCacheEntry).where(models.LLMCacheEntry.created_at < expired_before)
+    ).rowcount
+    overflow = session.exec(select(func.count()).select_from(models.LLMCacheEntry)).one() - max_entries
+    if overflow > 0:
+        oldest = (
+            select(models.LLMCacheEntry.key)
+            .order_by(models.LLMCacheEntry.last_used_at)
+            .limit(overflow)
+        )
+        deleted += session.execute(
+            delete(models.LLMCacheEntry).where(models.LLMCacheEntry.key.in_(oldest))
+        ).rowcount
+    session.commit()
+    return deleted
+
+
+def count_llm_cache_entries(session: Session) -> int:
+    return session.exec(select(func.count()).select_from(models.LLMCacheEntry)).one()
+
+
+def count_active_jobs(session: Session) -> int:
+    return session.exec(
+        select(func.count()).select_from(models.IngestJob).where(models.IngestJob.status.in_(["pending", "running"]))
+    ).one()
 
 
-def get_link_by_id(session: Session, link_id: int) -> models.Link | None:
-    return session.get(models.Link, link_id)
+def claim_links_to_refresh(
+    session: Session, stale_before: datetime, degraded_before: datetime, degraded, limit: int,
+) -> list[tuple[models.Link, datetime]]:
+    """Réserve jusqu'à `limit` liens à re-crawler : d'abord les dégradés (`degraded`, expression SQL),
+    puis les plus anciennement rafraîchis. refreshed_at sert de bail, comme updated_at pour les jobs.
+    Retourne (lien, refreshed_at d'avant la réservation) pour pouvoir la rendre (release_refresh_claims)"""
+    candidates = session.exec(
+        select(models.Link)
+        .where(models.Link.refreshed_at < degraded_before, degraded)
+        .order_by(models.Link.refreshed_at)
+        .limit(limit)
+    ).all()
+    if len(candidates) < limit:
+        candidates += session.exec(
+            select(models.Link)
+            .where(models.Link.refreshed_at < stale_before, models.Link.id.not_in([link.id for link in candidates]))
+            .order_by(models.Link.refreshed_at)
+            .limit(limit - len(candidates))
+        ).all()
 
+    now = datetime.utcnow()
+    claimed = []
+    for link in candidates:
+        # Lu avant l'UPDATE, qui synchronise aussi l'objet en session
+        previous = link.refreshed_at
+        # UPDATE conditionnel : un autre process qui a déjà réservé ce lien a changé refreshed_at
+        result = session.execute(
+            update(models.Link)
+            .where(models.Link.id == link.id, models.Link.refreshed_at == link.refreshed_at)
+            .values(refreshed_at=now)
+        )
+        if result.rowcount == 1:
+            claimed.append((link, previous))
+    session.commit()
+    for link, _ in claimed:
+        session.refresh(link)
+    return claimed
 
-def delete_link(session: Session, link_id: int) -> bool:
-    link = session.get(models.Link, link_id)
+
+def release_refresh_claims(session: Session, claims: list[tuple[models.Link, datetime]]) -> None:
+    """Rend les liens réservés mais non traités : refreshed_at reprend sa valeur d'avant la réservation,
+    sauf si le lien a été modifié entre-temps"""
+    for link, previous in claims:
+        session.execute(
+            update(models.Link)
+            .where(models.Link.id == link.id, models.Link.refreshed_at == link.refreshed_at)
+            .values(refreshed_at=previous)
+        )
+    session.commit()
+
+
+def update_link_content(session: Session, link_id: int, **values) -> None:
+    session.execute(update(models.Link).where(models.Link.id == link_id).values(**values))
+    if "tags" in values:
+        set_link_tags(session, link_id, values["tags"])
+    session.commit()
+
+
+def _tag_link_ids(*names: str):
+    """Ids des liens portant l'un de ces tags : parcours de ix_linktag_tag_id_link_id, indépendant de la taille de link"""
+    return (
+        select(models.LinkTag.link_id)
+        .join(models.Tag, models.Tag.id == models.LinkTag.tag_id)
+        .where(models.Tag.name.in_(names))
+    )
+
+
+def _insert_ignore(session: Session, model, rows: list[dict]):
+    """INSERT ... ON CONFLICT DO NOTHING (tags créés en parallèle par plusieurs workers)"""
+    dialect = postgresql if session.get_bind().dialect.name == "postgresql" else sqlite
+    session.execute(dialect.insert(model).values(rows).on_conflict_do_nothing())
+
+
+def set_link_tags(session: Session, link_id: int, names: list[str] | None) -> None:
+    """Aligne linktag sur `names` (déjà normalisés) et ajuste tag.link_count des tags ajoutés / retirés.
+    Ne committe pas : s'exécute dans la transaction qui écrit le lien"""
+    names = list(dict.fromkeys(names or []))
+    wanted = set()
+    if names:
+        _insert_ignore(session, models.Tag, [{"name": name, "link_count": 0} for name in names])
+        wanted = set(session.exec(select(models.Tag.id).where(models.Tag.name.in_(names))).all())
+    current = set(session.exec(select(models.LinkTag.tag_id).where(models.LinkTag.link_id == link_id)).all())
+
+    added, removed = wanted - current, current - wanted
+    if added:
+        session.execute(insert(models.LinkTag).values([{"link_id": link_id, "tag_id": tag_id} for tag_id in added]))
+        session.execute(update(models.Tag).where(models.Tag.id.in_(added)).values(link_count=models.Tag.link_count + 1))
+    if removed:
+        session.execute(delete(models.LinkTag).where(models.LinkTag.link_id == link_id, models.LinkTag.tag_id.in_(removed)))
+        session.execute(update(models.Tag).where(models.Tag.id.in_(removed)).values(link_count=models.Tag.link_count - 1))
+
+
+def add_links_tags(session: Session, link_tags: list[tuple[int, list[str] | None]]) -> None:
+    """set_link_tags en masse pour des liens qui viennent d'être insérés (aucune ligne linktag existante) :
+    une requête par paquet au lieu de plusieurs par lien. Ne committe pas"""
+    names = sorted({name for _, tags in link_tags for name in tags or []})
+    if not names:
+        return
+    tag_ids = {}
+    for start in range(0, len(names), 500):
+        chunk = names[start:start + 500]
+        _insert_ignore(session, models.Tag, [{"name": name, "link_count": 0} for name in chunk])
+        tag_ids.update(session.execute(select(models.Tag.name, models.Tag.id).where(models.Tag.name.in_(chunk))).all())
+
+    rows = [
+        {"link_id": link_id, "tag_id": tag_ids[name]}
+        for link_id, tags in link_tags
+        for name in dict.fromkeys(tags or [])
+    ]
+    connection = session.connection()
+    connection.execute(models.LinkTag.__table__.insert(), rows)
+    counts = Counter(row["tag_id"] for row in rows)
+    tag_table = models.Tag.__table__
+    connection.execute(
+        tag_table.update()
+        .where(tag_table.c.id == bindparam("tag_id_"))
+        .values(link_count=tag_table.c.link_count + bindparam("added")),
+        [{"tag_id_": tag_id, "added": added} for tag_id, added in counts.items()],
+    )
+
+
+# Colonnes écrites par l'import en masse (toutes sauf id)
+IMPORT_COLUMNS = [
+    "url", "canonical_url", "title", "description", "source", "resource_type",
+    "tags", "content", "content_hash", "created_at", "refreshed_at", "read",
+]
+
+
+def import_links(session: Session, rows: list[dict]) -> list[tuple[int, list[str] | None, str]]:
+    """Insère des liens complets (sans scraping ni Gemini) ; les URL canoniques déjà connues sont ignorées.
+    Retourne (id, tags, canonical_url) des liens créés. Ne committe pas"""
+    if session.get_bind().dialect.name == "postgresql":
+        return _copy_links(session, rows)
+    # executemany + RETURNING : SQLAlchemy regroupe les lignes en INSERT multi-lignes (insertmanyvalues)
+    link_table = models.Link.__table__
+    statement = (
+        sqlite.insert(link_table)
+        .on_conflict_do_nothing(index_elements=["canonical_url"])
+        .returning(link_table.c.id, link_table.c.tags, link_table.c.canonical_url)
+    )
+    result = session.connection().execute(statement, [{column: row[column] for column in IMPORT_COLUMNS} for row in rows])
+    return [tuple(row) for row in result.all()]
+
+
+def _copy_links(session: Session, rows: list[dict]) -> list[tuple[int, list[str] | None, str]]:
+    """COPY dans une table temporaire puis INSERT ... SELECT : le plus rapide sous PostgreSQL"""
+    columns = ", ".join(f'"{column}"' for column in IMPORT_COLUMNS)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow([_copy_value(column, row[column]) for column in IMPORT_COLUMNS])
+    buffer.seek(0)
+
+    session.execute(text(
+        f"CREATE TEMP TABLE IF NOT EXISTS link_import ON COMMIT DELETE ROWS AS SELECT {columns} FROM link WITH NO DATA"
+    ))
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY link_import ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+    finally:
+        cursor.close()
+    result = session.execute(text(
+        f"INSERT INTO link ({columns}) SELECT {columns} FROM link_import "
+        "ON CONFLICT (canonical_url) DO NOTHING RETURNING id, tags, canonical_url"
+    ))
+    return [tuple(row) for row in result.all()]
+
+
+def _copy_value(column: str, value):
+    if value is None:
+        return "\\N"
+    if column == "tags":
+        return json.dumps(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _tag_facets_statement(limit: int, prefix: str | None):
+    statement = select(models.Tag).where(models.Tag.link_count > 0)
+    if prefix:
+        statement = statement.where(models.Tag.name.startswith(prefix, autoescape=True))
+    return statement.order_by(models.Tag.link_count.desc(), models.Tag.name).limit(limit)
+
+
+def save_embeddings(session: Session, embeddings: list[models.LinkEmbedding]) -> None:
+    for embedding in embeddings:
+        session.merge(embedding)
+    session.commit()
+
+
+def get_embeddings(session: Session, model: str, after: tuple[datetime, int] | None = None, limit: int = 10000) -> list[models.LinkEmbedding]:
+    """Vecteurs du modèle courant par (updated_at, link_id) croissant, après `after` (chargement de l'index par paquets)"""
+    statement = select(models.LinkEmbedding).where(models.LinkEmbedding.model == model)
+    if after is not None:
+        statement = statement.where(tuple_(models.LinkEmbedding.updated_at, models.LinkEmbedding.link_id) > tuple_(*after))
+    return session.exec(
+        statement.order_by(models.LinkEmbedding.updated_at, models.LinkEmbedding.link_id).limit(limit)
+    ).all()
+
+
+def get_links_without_embedding(session: Session, model: str, after_id: int = 0, limit: int = 500) -> list[models.Link]:
+    indexed = select(models.LinkEmbedding.link_id).where(models.LinkEmbedding.model == model)
+    return session.exec(
+        select(models.Link)
+        .where(models.Link.id > after_id, models.Link.id.not_in(indexed))
+        .order_by(models.Link.id)
+        .limit(limit)
+    ).all()
+
+
+# Endpoints de l'API (AsyncSession) ; les requêtes sont construites par les _*_statement
+
+
+async def get_links_async(
+    session: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: tuple[datetime, int] | None = None,
+    read: bool | None = None,
+    resource_type: str | None = None,
+    source: str | None = None,
+    fields: list[str] | None = None,
+    tags: list[str] | None = None,
+    tags_any: bool = False,
+) -> list:
+    """Liens du plus récent au plus ancien, paginés par curseur (created_at, id).
+    Avec `fields`, seules ces colonnes sont lues et des lignes (mappings) sont retournées.
+    `tags` (formes normalisées) : liens portant tous ces tags, ou au moins l'un d'eux avec `tags_any`."""
+    statement = _links_statement(skip, limit, cursor, read, resource_type, source, fields, tags, tags_any)
+    if fields:
+        return (await session.execute(statement)).mappings().all()
+    return (await session.exec(statement)).all()
+
+
+async def get_link_by_id_async(session: AsyncSession, link_id: int) -> models.Link | None:
+    return await session.get(models.Link, link_id)
+
+
+async def get_link_by_canonical_url_async(session: AsyncSession, canonical_url: str) -> models.Link | None:
+    return (await session.exec(_canonical_url_statement(canonical_url))).first()
+
+
+async def delete_link_async(session: AsyncSession, link_id: int) -> bool:
+    link = await session.get(models.Link, link_id)
     if link:
-        session.delete(link)
-        session.commit()
+        await session.delete(link)
+        await session.execute(delete(models.LinkEmbedding).where(models.LinkEmbedding.link_id == link_id))
+        await session.run_sync(set_link_tags, link_id, [])
+        await session.commit()
         return True
     return False
+
+
+async def create_job_async(
+    session: AsyncSession, link: models.LinkCreate, canonical_url: str, link_id: int | None = None
+) -> models.IngestJob:
+    """Crée un job ; s'il pointe déjà vers un lien existant (doublon), il est directement terminé"""
+    job = _new_job(link, canonical_url, link_id)
+    session.add(job)
+    await session.commit()
+    await session.refresh(job)
+    return job
+
+
+async def get_job_by_id_async(session: AsyncSession, job_id: int) -> models.IngestJob | None:
+    return await session.get(models.IngestJob, job_id)
+
+
+async def get_active_job_async(session: AsyncSession, canonical_url: str) -> models.IngestJob | None:
+    """Job en attente ou en cours pour la même URL canonique"""
+    return (await session.exec(_active_job_statement(canonical_url))).first()
+
+
+async def get_links_by_ids_async(session: AsyncSession, link_ids: list[int], resource_type: str | None = None) -> list[models.Link]:
+    statement = select(models.Link).where(models.Link.id.in_(link_ids))
+    if resource_type is not None:
+        statement = statement.where(models.Link.resource_type == resource_type)
+    return (await session.exec(statement)).all()
+
+
+async def get_tag_facets_async(session: AsyncSession, limit: int = 100, prefix: str | None = None) -> list[models.Tag]:
+    """Tags par nombre de liens décroissant : lecture des compteurs, sans agréger la table link"""
+    return (await session.exec(_tag_facets_statement(limit, prefix))).all()
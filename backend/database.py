@@ -1,22 +1,63 @@
 from sqlmodel import create_engine
 from sqlalchemy import pool
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine
 from dotenv import load_dotenv
 import os
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Logger chaque requête SQL coûte cher : désactivé sauf en debug
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Réplica de lecture : ni scraping, ni Gemini, ni écriture (ingestion, import, suppression, refresh, vecteurs)
+READ_ONLY = os.getenv("READ_ONLY", "false").lower() in ("1", "true", "yes")
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True,
-    poolclass=pool.QueuePool,
-    pool_size=5,
-    max_overflow=10,
-    pool_pre_ping=True,  # Vérifie la connexion avant utilisation
-    pool_recycle=3600,   # Recycle connexions après 1h
-    connect_args={
-        "sslmode": "require",  # Force SSL
-        "connect_timeout": 10,
-    }
-)
+# Drivers asynchrones utilisés par les endpoints de l'API
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+def async_database_url(database_url: str):
+    url = make_url(database_url)
+    # asyncpg ne connaît pas sslmode (passé via connect_args["ssl"])
+    return url.set(drivername=ASYNC_DRIVERS[url.get_backend_name()]).difference_update_query(["sslmode"])
+
+
+if DATABASE_URL.startswith("sqlite"):
+    # Base locale (dev / tests) : pas de SSL, connexions partagées entre threads
+    engine = create_engine(
+        DATABASE_URL,
+        echo=DB_ECHO,
+        connect_args={"check_same_thread": False},
+    )
+    async_engine = create_async_engine(async_database_url(DATABASE_URL), echo=DB_ECHO)
+else:
+    # Moteur synchrone : workers d'ingestion, import par lots, migrations
+    engine = create_engine(
+        DATABASE_URL,
+        echo=DB_ECHO,
+        poolclass=pool.QueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,  # Vérifie la connexion avant utilisation
+        pool_recycle=3600,   # Recycle connexions après 1h
+        connect_args={
+            "sslmode": "require",  # Force SSL
+            "connect_timeout": 10,
+        }
+    )
+    # Moteur asynchrone (asyncpg) : endpoints de l'API, sans passer par le threadpool
+    async_engine = create_async_engine(
+        async_database_url(DATABASE_URL),
+        echo=DB_ECHO,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+        connect_args={
+            "ssl": "require",  # équivalent asyncpg de sslmode=require
+            "timeout": 10,
+        }
+    )
@@ -0,0 +1,343 @@
+"""
+Recherche sémantique et liens similaires : un vecteur par lien (titre, description, tags,
+début du contenu), stocké en float32 dans la table linkembedding et servi par un index
+en mémoire (HNSW si hnswlib est installé, produit matriciel numpy sinon)
+
+    cd backend
+    python -m embeddings            # calcule les vecteurs manquants (backfill, changement de modèle)
+"""
+import hashlib
+import logging
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlmodel import Session
+
+import crud
+import metrics
+import models
+from database import READ_ONLY, engine
+
+try:
+    import hnswlib
+except ImportError:  # index exact numpy : suffisant jusqu'à quelques centaines de milliers de liens
+    hnswlib = None
+
+# Vide : vectoriseur par hachage, déterministe et sans dépendance.
+# Sinon nom d'un modèle sentence-transformers (ex. "all-MiniLM-L6-v2")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))
+EMBEDDING_ANN = os.getenv("EMBEDDING_ANN", "auto")  # auto | hnsw | exact
+# Délai entre deux relectures des vecteurs écrits par d'autres processus
+EMBEDDING_SYNC_INTERVAL = float(os.getenv("EMBEDDING_SYNC_INTERVAL", "10"))
+# Le début du contenu suffit à situer un lien ; au-delà le vecteur se dilue
+EMBEDDING_CONTENT_CHARS = 2000
+LOAD_BATCH = 10000
+# Chaque relecture reprend les vecteurs écrits un peu avant la précédente : une écriture horodatée
+# avant la dernière lue mais commitée après (autre process, horloges décalées) n'est pas perdue
+SYNC_OVERLAP = timedelta(seconds=60)
+
+_TOKEN = re.compile(r"\w{2,}")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def link_text(link: models.Link) -> str:
+    """Texte vectorisé : le titre compte double, le contenu est tronqué"""
+    parts = [link.title, link.title, link.description, " ".join(link.tags or []), (link.content or "")[:EMBEDDING_CONTENT_CHARS]]
+    return "\n".join(part for part in parts if part)
+
+
+class HashingEmbedder:
+    """Unigrammes et bigrammes de mots hachés (blake2b) dans `dim` composantes signées, tf sous-linéaire.
+    Pas de modèle à charger : rapproche les liens qui partagent du vocabulaire"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    @staticmethod
+    def _tokens(text: str) -> list[str]:
+        text = unicodedata.normalize("NFKD", text.lower())
+        text = "".join(char for char in text if not unicodedata.combining(char))
+        return _TOKEN.findall(text)
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            tokens = self._tokens(text)
+            counts: dict[str, int] = {}
+            for feature in tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]:
+                counts[feature] = counts.get(feature, 0) + 1
+            for feature, count in counts.items():
+                digest = int.from_bytes(hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little")
+                sign = 1.0 if digest >> 63 else -1.0
+                vectors[row, digest % self.dim] += sign * (1 + math.log(count))
+        return _normalize(vectors)
+
+
+class SentenceEmbedder:
+    def __init__(self, model_name: str):
+        # Importé ici : sentence-transformers charge torch (plusieurs secondes), inutile avec le hachage
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            raise RuntimeError("EMBEDDING_MODEL requires the sentence-transformers package")
+        self._model = SentenceTransformer(model_name)
+        self.dim = self._model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        vectors = self._model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32)
+
+
+class ExactIndex:
+    """Matrice contiguë des vecteurs (normalisés : produit scalaire = cosinus), capacité doublée à la demande"""
+
+    def __init__(self, dim: int):
+        self._vectors = np.zeros((1024, dim), dtype=np.float32)
+        self._ids = np.zeros(1024, dtype=np.int64)
+        self._positions: dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def add(self, ids: list[int], vectors: np.ndarray):
+        for link_id, vector in zip(ids, vectors):
+            position = self._positions.get(link_id)
+            if position is None:
+                position = len(self._positions)
+                if position == len(self._ids):
+                    self._vectors = np.resize(self._vectors, (2 * position, self._vectors.shape[1]))
+                    self._ids = np.resize(self._ids, 2 * position)
+                self._positions[link_id] = position
+                self._ids[position] = link_id
+            self._vectors[position] = vector
+
+    def remove(self, link_id: int):
+        position = self._positions.pop(link_id, None)
+        if position is None:
+            return
+        last = len(self._positions)
+        if position != last:
+            # La dernière ligne prend la place libérée : la matrice reste dense
+            moved = int(self._ids[last])
+            self._vectors[position] = self._vectors[last]
+            self._ids[position] = moved
+            self._positions[moved] = position
+
+    def get(self, link_id: int) -> np.ndarray | None:
+        position = self._positions.get(link_id)
+        return None if position is None else self._vectors[position].copy()
+
+    def search(self, vector: np.ndarray, k: int) -> list[tuple[int, float]]:
+        count = len(self._positions)
+        k = min(k, count)
+        if k == 0:
+            return []
+        scores = self._vectors[:count] @ vector
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(self._ids[i]), float(scores[i])) for i in top]
+
+
+class HNSWIndex:
+    """Graphe HNSW (hnswlib) en produit scalaire : requêtes en O(log n)"""
+
+    def __init__(self, dim: int, capacity: int = 1024):
+        self._index = hnswlib.Index(space="ip", dim=dim)
+        self._index.init_index(max_elements=capacity, ef_construction=100, M=16)
+        self._index.set_ef(64)
+        self._ids: set[int] = set()
+        self._deleted: set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, ids: list[int], vectors: np.ndarray):
+        needed = self._index.get_current_count() + len(ids)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        for link_id in self._deleted.intersection(ids):
+            self._index.unmark_deleted(link_id)
+            self._deleted.discard(link_id)
+        self._index.add_items(vectors, ids)
+        self._ids.update(ids)
+
+    def remove(self, link_id: int):
+        if link_id in self._ids:
+            self._index.mark_deleted(link_id)
+            self._ids.discard(link_id)
+            self._deleted.add(link_id)
+
+    def get(self, link_id: int) -> np.ndarray | None:
+        if link_id not in self._ids:
+            return None
+        return np.asarray(self._index.get_items([link_id])[0], dtype=np.float32)
+
+    def search(self, vector: np.ndarray, k: int) -> list[tuple[int, float]]:
+        k = min(k, len(self._ids))
+        if k == 0:
+            return []
+        self._index.set_ef(max(64, k))
+        labels, distances = self._index.knn_query(vector, k=k)
+        # Espace "ip" : distance = 1 - produit scalaire
+        return [(int(label), 1.0 - float(distance)) for label, distance in zip(labels[0], distances[0])]
+
+
+class SemanticIndex:
+    def __init__(self, model_name: str, dim: int, ann: str):
+        self.model_name = model_name
+        self.dim = dim
+        self.ann = ann
+        self._embedder = None
+        self._index = None
+        self._lock = threading.Lock()
+        self._synced_up_to: datetime | None = None  # plus grand updated_at lu depuis la table
+        self._last_sync = 0.0
+        self._loading: threading.Thread | None = None
+        self._stats = {"embedded": 0, "queries": 0, "loaded": 0, "load_seconds": 0.0, "errors": 0}
+
+    @property
+    def embedder(self):
+        # Chargé au premier usage : un modèle sentence-transformers prend plusieurs secondes
+        if self._embedder is None:
+            if self.model_name:
+                self._embedder = SentenceEmbedder(self.model_name)
+            else:
+                self._embedder = HashingEmbedder(self.dim)
+        return self._embedder
+
+    @property
+    def backend(self) -> str:
+        use_hnsw = self.ann == "hnsw" or (self.ann == "auto" and hnswlib is not None)
+        return "hnsw" if use_hnsw else "exact"
+
+    def _vector_index(self):
+        if self._index is None:
+            dim = self.embedder.dim
+            self._index = HNSWIndex(dim) if self.backend == "hnsw" else ExactIndex(dim)
+        return self._index
+
+    def start(self):
+        """Charge les vecteurs existants dans un thread : l'API démarre sans attendre l'index"""
+        if self._loading is None:
+            self._loading = threading.Thread(target=self.load, name="embedding-index-load", daemon=True)
+            self._loading.start()
+
+    def load(self):
+        started = time.perf_counter()
+        loaded = self.sync(force=True)
+        self._stats["load_seconds"] = round(time.perf_counter() - started, 3)
+        metrics.log("embedding_index_loaded", vectors=loaded, backend=self.backend, model=self.embedder.name, seconds=self._stats["load_seconds"])
+
+    def sync(self, force: bool = False) -> int:
+        """Ajoute à l'index les vecteurs écrits depuis la dernière lecture (autres processus API ou workers)"""
+        if not force and time.monotonic() - self._last_sync < EMBEDDING_SYNC_INTERVAL:
+            return 0
+        self._last_sync = time.monotonic()
+        loaded = 0
+        # add() remplace un vecteur déjà indexé : relire le recouvrement est sans effet de bord
+        after = (self._synced_up_to - SYNC_OVERLAP, 0) if self._synced_up_to else None
+        with Session(engine) as session:
+            while rows := crud.get_embeddings(session, self.embedder.name, after=after, limit=LOAD_BATCH):
+                vectors = np.frombuffer(b"".join(row.vector for row in rows), dtype=np.float32).reshape(len(rows), -1)
+                with self._lock:
+                    self._vector_index().add([row.link_id for row in rows], vectors)
+                after = (rows[-1].updated_at, rows[-1].link_id)
+                self._synced_up_to = max(self._synced_up_to or after[0], after[0])
+                loaded += len(rows)
+        self._stats["loaded"] += loaded
+        return loaded
+
+    def index_links(self, links: list[tuple[int, str]]):
+        """Calcule, enregistre et indexe les vecteurs de (link_id, texte)"""
+        if not links:
+            return
+        with metrics.span("embedding", links=len(links)):
+            vectors = self.embedder.embed([text for _, text in links])
+            with Session(engine) as session:
+                crud.save_embeddings(session, [
+                    models.LinkEmbedding(link_id=link_id, model=self.embedder.name, vector=vector.tobytes())
+                    for (link_id, _), vector in zip(links, vectors)
+                ])
+            with self._lock:
+                self._vector_index().add([link_id for link_id, _ in links], vectors)
+        self._stats["embedded"] += len(links)
+
+    def index_links_safely(self, links: list[tuple[int, str]]) -> int:
+        """Étape d'ingestion : un échec ne fait pas échouer l'ingestion, le backfill rattrapera.
+        Retourne le nombre de liens indexés (0 en cas d'échec)"""
+        try:
+            self.index_links(links)
+        except Exception as e:
+            self._stats["errors"] += 1
+            metrics.log("embedding_failed", level=logging.WARNING, links=len(links), error=repr(e))
+            return 0
+        return len(links)
+
+    def remove(self, link_id: int):
+        with self._lock:
+            self._vector_index().remove(link_id)
+
+    def _search(self, vector: np.ndarray, k: int, exclude: int | None = None) -> list[tuple[int, float]]:
+        self._stats["queries"] += 1
+        with self._lock:
+            hits = self._vector_index().search(vector, k + (exclude is not None))
+        # Similarité nulle ou négative : aucun vocabulaire commun, pas un voisin
+        return [(link_id, score) for link_id, score in hits if link_id != exclude and score > 0][:k]
+
+    def related(self, link: models.Link, k: int) -> list[tuple[int, float]]:
+        """Liens les plus proches de `link` (vecteur calculé à la volée s'il manque)"""
+        self.sync()
+        with self._lock:
+            vector = self._vector_index().get(link.id)
+        if vector is None and READ_ONLY:
+            # Réplica de lecture : vecteur gardé en mémoire le temps de la requête, rien n'est écrit
+            vector = self.embedder.embed([link_text(link)])[0]
+        elif vector is None:
+            self.index_links([(link.id, link_text(link))])
+            with self._lock:
+                vector = self._vector_index().get(link.id)
+        return self._search(vector, k, exclude=link.id)
+
+    def query(self, q: str, k: int) -> list[tuple[int, float]]:
+        self.sync()
+        return self._search(self.embedder.embed([q])[0], k)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            size = len(self._index) if self._index is not None else 0
+        return {**self._stats, "vectors": size, "dim": self.dim if self._embedder is None else self._embedder.dim, "hnsw": self.backend == "hnsw"}
+
+
+index = SemanticIndex(EMBEDDING_MODEL, EMBEDDING_DIM, EMBEDDING_ANN)
+
+
+def backfill(batch_size: int = 500) -> int:
+    """Vectorise les liens qui n'ont pas de vecteur pour le modèle courant"""
+    done, after_id = 0, 0
+    while True:
+        with Session(engine) as session:
+            links = crud.get_links_without_embedding(session, index.embedder.name, after_id=after_id, limit=batch_size)
+        if not links:
+            return done
+        index.index_links([(link.id, link_text(link)) for link in links])
+        after_id = links[-1].id
+        done += len(links)
+        print(f"{done} links embedded")
+
+
+if __name__ == "__main__":
+    print(f"Backfill done: {backfill()} links embedded with {index.embedder.name}")
@@ -0,0 +1,328 @@
+"""
+Extraction du contenu des pages en une seule passe : titre, meta description,
+URL canonique et texte principal, avec arrêt dès que le budget de caractères est atteint
+"""
+import os
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+
+try:
+    from lxml import etree
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+# Limiter à 3000 caractères pour Gemini ! IMPORTANT !
+TEXT_BUDGET = 3000
+EXTRACTION_ENGINE = os.getenv("EXTRACTION_ENGINE", "lxml" if LXML_AVAILABLE else "stream")
+# Le document est donné au parser par morceaux pour pouvoir s'arrêter tôt
+FEED_CHUNK_SIZE = 16 * 1024
+
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg"}
+BLOCK_TAGS = {
+    "p", "div", "br", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "section",
+    "article", "main", "header", "footer", "blockquote", "pre", "tr", "td", "th", "table",
+}
+CONTENT_CLASSES = {"content", "post", "article"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.IGNORECASE)
+
+
+@dataclass
+class Extraction:
+    title: str | None
+    description: str | None
+    canonical_url: str | None
+    text: str
+
+
+def decode_html(html_content: bytes | str) -> str:
+    """Décode le document ; le BOM éventuel est retiré (lxml l'ignore, html.parser le garderait dans le texte)"""
+    if isinstance(html_content, str):
+        return html_content.removeprefix("\ufeff")
+    if html_content.startswith(b"\xef\xbb\xbf"):
+        return html_content[3:].decode("utf-8", errors="replace")
+    match = _CHARSET.search(html_content[:4096])
+    if match:
+        try:
+            return html_content.decode(match.group(1).decode("ascii"), errors="replace")
+        except LookupError:
+            pass
+    try:
+        return html_content.decode("utf-8")
+    except UnicodeDecodeError:
+        # Pages anciennes sans charset déclaré : le plus souvent du latin-1 / windows-1252
+        return html_content.decode("cp1252", errors="replace")
+
+
+class _TextBuffer:
+    """Texte normalisé (espaces fusionnés) plafonné à `budget` caractères"""
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self.parts: list[str] = []
+        self.size = 0
+        self.pending_space = False
+
+    @property
+    def full(self) -> bool:
+        return self.size >= self.budget
+
+    def add(self, data: str):
+        if self.full:
+            return
+        if data[:1].isspace():
+            self.pending_space = True
+        words = data.split()
+        if not words:
+            return
+        chunk = " ".join(words)
+        if self.pending_space and self.parts:
+            chunk = " " + chunk
+        self.parts.append(chunk)
+        self.size += len(chunk)
+        self.pending_space = data[-1:].isspace()
+
+    def separate(self):
+        self.pending_space = True
+
+    def text(self) -> str:
+        return "".join(self.parts)[:self.budget]
+
+
+class _Collector:
+    """Machine à états commune aux parsers (html.parser et lxml).
+    Le texte est collecté dans un buffer par conteneur candidat, dans l'ordre de priorité
+    de l'ancienne extraction : <article>, puis <main>, puis div.content/.post/.article, puis la page."""
+
+    CANDIDATES = ("article", "main", "div", "page")
+
+    def __init__(self, budget: int):
+        self.title: str | None = None
+        self.og_title: str | None = None
+        self.description: str | None = None
+        self.og_description: str | None = None
+        self.canonical: str | None = None
+        self.buffers = {name: _TextBuffer(budget) for name in self.CANDIDATES}
+        # Profondeur d'ouverture du premier conteneur de chaque type (None = pas ouvert)
+        self._open: dict[str, int | None] = {name: None for name in self.CANDIDATES}
+        self._closed: set[str] = set()
+        # Pile des balises ouvertes : les balises non fermées (<p>, <li>...) sont dépilées
+        # à la fermeture de leur parent, comme le ferait un navigateur
+        self._stack: list[str] = []
+        self._skip_depth: int | None = None
+        self._in_title = False
+        self._title_parts: list[str] = []
+        self.done = False
+
+    def start(self, tag: str, attrs: dict):
+        tag = tag.lower()
+        if tag == "meta":
+            self._meta(attrs)
+            return
+        if tag == "link":
+            rel = (attrs.get("rel") or "").lower().split()
+            if "canonical" in rel and self.canonical is None:
+                self.canonical = attrs.get("href")
+            return
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._separate()
+            return
+
+        self._stack.append(tag)
+        depth = len(self._stack)
+        if tag == "title" and self.title is None and self._skip_depth is None:
+            self._in_title = True
+        elif tag in SKIPPED_TAGS and self._skip_depth is None:
+            self._skip_depth = depth
+
+        candidate = self._candidate(tag, attrs)
+        if candidate and self._open[candidate] is None and candidate not in self._closed:
+            self._open[candidate] = depth
+        if tag in BLOCK_TAGS:
+            self._separate()
+
+    def end(self, tag: str):
+        tag = tag.lower()
+        if tag in VOID_TAGS or tag not in self._stack:
+            return
+        while self._stack.pop() != tag:
+            pass
+        depth = len(self._stack)
+
+        if tag == "title" and self._in_title:
+            self._in_title = False
+            self.title = " ".join("".join(self._title_parts).split()) or None
+        if self._skip_depth is not None and depth < self._skip_depth:
+            self._skip_depth = None
+        for name, opened_at in self._open.items():
+            if opened_at is not None and depth < opened_at:
+                self._open[name] = None
+                self._closed.add(name)
+        if tag in BLOCK_TAGS:
+            self._separate()
+        # Le premier <article> est terminé : c'est le texte retenu, inutile de lire la suite
+        if "article" in self._closed or self.buffers["article"].full:
+            self.done = True
+
+    def data(self, data: str):
+        if self._in_title:
+            self._title_parts.append(data)
+            return
+        if self._skip_depth is not None:
+            return
+        self.buffers["page"].add(data)
+        for name in ("article", "main", "div"):
+            if self._open[name] is not None:
+                self.buffers[name].add(data)
+
+    def _separate(self):
+        for buffer in self.buffers.values():
+            buffer.separate()
+
+    def _candidate(self, tag: str, attrs: dict) -> str | None:
+        if tag in ("article", "main"):
+            return tag
+        if tag == "div" and CONTENT_CLASSES & set((attrs.get("class") or "").split()):
+            return "div"
+        return None
+
+    def _meta(self, attrs: dict):
+        name = (attrs.get("name") or attrs.get("property") or "").lower()
+        content = attrs.get("content")
+        if content is None:
+            return
+        if name == "description" and self.description is None:
+            self.description = content.strip()
+        elif name == "og:description" and self.og_description is None:
+            self.og_description = content.strip()
+        elif name == "og:title" and self.og_title is None:
+            self.og_title = content.strip()
+
+    def result(self) -> Extraction:
+        text = ""
+        for name in self.CANDIDATES:
+            if self.buffers[name].size:
+                text = self.buffers[name].text()
+                break
+        return Extraction(
+            title=self.title or self.og_title,
+            description=self.description or self.og_description,
+            canonical_url=self.canonical,
+            text=text,
+        )
+
+
+class _StdlibParser(HTMLParser):
+    def __init__(self, collector: _Collector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, dict((k, v or "") for k, v in attrs))
+
+    def handle_startendtag(self, tag, attrs):
+        self.collector.start(tag, dict((k, v or "") for k, v in attrs))
+        if tag.lower() not in VOID_TAGS:
+            self.collector.end(tag)
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+class _LxmlTarget:
+    """Cible de parsing lxml (interface start/end/data/close)"""
+
+    def __init__(self, collector: _Collector):
+        self.collector = collector
+
+    def start(self, tag, attrib):
+        if isinstance(tag, str):
+            self.collector.start(tag, dict(attrib))
+
+    def end(self, tag):
+        if isinstance(tag, str):
+            self.collector.end(tag)
+
+    def data(self, data):
+        self.collector.data(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        return None
+
+
+def _feed(parser, collector: _Collector, document: str):
+    for offset in range(0, len(document), FEED_CHUNK_SIZE):
+        parser.feed(document[offset:offset + FEED_CHUNK_SIZE])
+        if collector.done:
+            return
+    # lxml lève XMLSyntaxError ("no element found") à la fermeture d'un document vide
+    if document.strip():
+        parser.close()
+
+
+def extract_stream(html_content: bytes | str, budget: int = TEXT_BUDGET) -> Extraction:
+    collector = _Collector(budget)
+    _feed(_StdlibParser(collector), collector, decode_html(html_content))
+    return collector.result()
+
+
+def extract_lxml(html_content: bytes | str, budget: int = TEXT_BUDGET) -> Extraction:
+    collector = _Collector(budget)
+    parser = etree.HTMLParser(target=_LxmlTarget(collector), remove_comments=True)
+    try:
+        _feed(parser, collector, decode_html(html_content))
+    except etree.XMLSyntaxError:
+        # Document sans aucun élément (commentaires seuls...) : comme une page vide
+        pass
+    return collector.result()
+
+
+def extract_bs4(html_content: bytes | str, budget: int = TEXT_BUDGET) -> Extraction:
+    """Ancienne implémentation (arbre BeautifulSoup complet), gardée comme référence pour le benchmark"""
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html_content, "html.parser")
+
+    title = soup.title.string if soup.title else None
+    description_tag = soup.find("meta", attrs={"name": "description"})
+    canonical_tag = soup.find("link", rel="canonical")
+
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    article = soup.find("article") or soup.find("main") or soup.find("div", class_=["content", "post", "article"])
+    text = article.get_text() if article else soup.get_text()
+
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+
+    return Extraction(
+        title=title,
+        description=description_tag.get("content") if description_tag else None,
+        canonical_url=canonical_tag.get("href") if canonical_tag else None,
+        text=text[:budget],
+    )
+
+
+ENGINES = {
+    "stream": extract_stream,
+    "bs4": extract_bs4,
+}
+if LXML_AVAILABLE:
+    ENGINES["lxml"] = extract_lxml
+
+
+def extract(html_content: bytes | str, budget: int = TEXT_BUDGET, engine: str | None = None) -> Extraction:
+    """Extrait titre, description, URL canonique et texte principal avec le moteur configuré"""
+    return ENGINES.get(engine or EXTRACTION_ENGINE, extract_stream)(html_content, budget)
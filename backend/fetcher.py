@@ -0,0 +1,181 @@
+"""
+Client HTTP asynchrone partagé par le pipeline d'ingestion : connexions poolées
+(HTTP/2 si disponible), concurrence bornée par hôte, taille de réponse plafonnée
+et revalidation ETag / Last-Modified des URLs déjà vues
+"""
+import asyncio
+import logging
+import os
+import zlib
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from urllib.parse import urlparse
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+import crud
+import metrics
+import models
+from database import engine
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "10"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+FETCH_PER_HOST_CONCURRENCY = int(os.getenv("FETCH_PER_HOST_CONCURRENCY", "4"))
+FETCH_MAX_CONNECTIONS = int(os.getenv("FETCH_MAX_CONNECTIONS", "50"))
+# Entrées de fetchcache (validateurs + corps compressé) : plus vieilles que le TTL ignorées puis supprimées,
+# les plus anciennes évincées au-delà de FETCH_CACHE_MAX_ENTRIES. TTL > REFRESH_MAX_AGE_DAYS (30 j)
+# pour que le re-crawl reste une requête conditionnelle
+FETCH_CACHE_TTL = timedelta(seconds=int(os.getenv("FETCH_CACHE_TTL", str(45 * 24 * 3600))))
+FETCH_CACHE_MAX_ENTRIES = int(os.getenv("FETCH_CACHE_MAX_ENTRIES", "2000"))
+# L'éviction est faite toutes les N écritures plutôt qu'à chaque fois
+EVICT_EVERY = 50
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+
+@dataclass
+class FetchResult:
+    url: str  # URL finale, après redirections
+    status_code: int
+    content: bytes
+    truncated: bool = False
+    not_modified: bool = False  # 304 : contenu servi depuis fetchcache
+
+
+def load_cache_entry(url: str) -> models.FetchCache | None:
+    with Session(engine) as session:
+        entry = crud.get_fetch_cache(session, url)
+    if entry is not None and entry.fetched_at < datetime.utcnow() - FETCH_CACHE_TTL:
+        return None
+    return entry
+
+
+def save_cache_entry(url: str, etag: str | None, last_modified: str | None, content: bytes, evict: bool = False) -> int:
+    """Enregistre l'entrée ; avec `evict`, purge aussi le cache (TTL puis taille). Retourne le nombre d'entrées évincées"""
+    entry = models.FetchCache(
+        url=url,
+        etag=etag,
+        last_modified=last_modified,
+        content=zlib.compress(content),
+        fetched_at=datetime.utcnow(),
+    )
+    with Session(engine) as session:
+        crud.save_fetch_cache(session, entry)
+        if not evict:
+            return 0
+        return crud.evict_fetch_cache(
+            session, expired_before=datetime.utcnow() - FETCH_CACHE_TTL, max_entries=FETCH_CACHE_MAX_ENTRIES,
+        )
+
+
+class Fetcher:
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+        self._host_slots: dict[str, asyncio.Semaphore] = {}
+        self._cache_writes = 0
+        self._stats = {
+            "requests": 0,
+            "not_modified": 0,
+            "truncated": 0,
+            "errors": 0,
+            "bytes_downloaded": 0,
+            "cache_evicted": 0,
+        }
+
+    async def start(self):
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            http2=HTTP2_AVAILABLE,
+            follow_redirects=True,
+            timeout=FETCH_TIMEOUT,
+            headers={"User-Agent": USER_AGENT},
+            limits=httpx.Limits(
+                max_connections=FETCH_MAX_CONNECTIONS,
+                max_keepalive_connections=FETCH_MAX_CONNECTIONS,
+            ),
+        )
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str):
+        host = (urlparse(url).hostname or "").lower()
+        slot = self._host_slots.setdefault(host, asyncio.Semaphore(FETCH_PER_HOST_CONCURRENCY))
+        async with slot:
+            yield
+
+    async def _read_capped(self, response: httpx.Response) -> tuple[bytes, bool]:
+        """Lit le corps jusqu'à FETCH_MAX_BYTES puis coupe la connexion"""
+        chunks = []
+        size = 0
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            size += len(chunk)
+            if size >= FETCH_MAX_BYTES:
+                return b"".join(chunks)[:FETCH_MAX_BYTES], True
+        return b"".join(chunks), False
+
+    async def fetch(self, url: str, headers: dict | None = None) -> FetchResult:
+        """GET conditionnel ; lève httpx.HTTPError si la page n'est pas récupérable"""
+        if self._client is None:
+            await self.start()
+
+        cached = await run_in_threadpool(load_cache_entry, url)
+        request_headers = dict(headers or {})
+        if cached is not None:
+            if cached.etag:
+                request_headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                request_headers["If-Modified-Since"] = cached.last_modified
+
+        self._stats["requests"] += 1
+        try:
+            async with self._host_slot(url):
+                async with self._client.stream("GET", url, headers=request_headers) as response:
+                    if response.status_code == 304 and cached is not None:
+                        self._stats["not_modified"] += 1
+                        return FetchResult(
+                            url=str(response.url),
+                            status_code=304,
+                            content=zlib.decompress(cached.content),
+                            not_modified=True,
+                        )
+                    response.raise_for_status()
+                    content, truncated = await self._read_capped(response)
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+                    final_url = str(response.url)
+        except httpx.HTTPError:
+            self._stats["errors"] += 1
+            raise
+
+        self._stats["bytes_downloaded"] += len(content)
+        self._stats["truncated"] += int(truncated)
+        if etag or last_modified:
+            self._cache_writes += 1
+            evict = self._cache_writes % EVICT_EVERY == 0
+            try:
+                self._stats["cache_evicted"] += await run_in_threadpool(save_cache_entry, url, etag, last_modified, content, evict)
+            except Exception as e:
+                metrics.log("fetch_cache_failed", level=logging.WARNING, url=url, error=repr(e))
+
+        return FetchResult(url=final_url, status_code=response.status_code, content=content, truncated=truncated)
+
+    def get_stats(self) -> dict:
+        return {**self._stats, "http2": HTTP2_AVAILABLE, "hosts": len(self._host_slots)}
+
+
+client = Fetcher()
@@ -0,0 +1,221 @@
+"""
+Pipeline d'ingestion : scraping, extraction du contenu et génération des métadonnées
+"""
+import hashlib
+import json
+import logging
+import re
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+import crud
+import extraction
+import llm
+import llm_cache
+import metrics
+import models
+import sources
+import tagging
+import urls
+from database import engine
+from sources import FetchError  # noqa: F401  (réexporté : jobs.py et refresh.py attrapent ingest.FetchError)
+
+GEMINI_MODEL = llm.GEMINI_MODEL
+
+# Métadonnées de repli quand Gemini échoue : refresh.py repasse sur les liens qui les portent
+FALLBACK_TITLE = "No title found"
+FALLBACK_DESCRIPTION = "No description"
+FALLBACK_TAGS = ["web"]
+
+ARTICLE_PROMPT = """Tu es un assistant qui résume des articles web de manière concise et pertinente.
+
+URL: {url}
+
+Contenu de la page:
+{article_content}
+
+INSTRUCTIONS STRICTES:
+1. Génère un titre COURT (3-8 mots maximum) qui capture l'essence de l'article
+2. Génère une description CONCISE (1-2 phrases, max 150 caractères) 
+3. Extrait 2-4 CATÉGORIES GÉNÉRALES (pas de mots spécifiques). Exemples de bonnes catégories:
+   - Technologie: backend, frontend, devops, cloud, mobile, web, ia, data
+   - Développement: tutorial, guide, documentation, tips
+   - Domaine: software, hardware, design, business, productivity
+   - Thème: security, performance, architecture, testing
+4. Sois DIRECT et FACTUEL, pas de formulations marketing
+5. Les tags doivent être GÉNÉRIQUES et RÉUTILISABLES (pas de noms propres, pas de mots trop spécifiques)
+
+IMPORTANT: Réponds UNIQUEMENT avec ce JSON (sans ```json ni backticks):
+{{"title": "votre titre ici", "description": "votre description ici", "tags": ["categorie1", "categorie2", "categorie3"]}}"""
+
+RESOURCE_PROMPT = """Tu es un assistant qui catégorise des ressources techniques (repos GitHub, software, outils, etc.).
+
+URL: {url}{desc_info}
+
+Contenu de la page:
+{article_content}
+
+INSTRUCTIONS:
+1. Génère un titre TRÈS SIMPLE et COURT (3-6 mots max) qui identifie la ressource
+   Exemples: "Repo GitHub Rust", "VSCode Extension", "PostgreSQL Database", "Docker Tool"
+2. Génère une description CONCISE (1 phrase courte, max 100 caractères)
+3. Attribue 1-3 catégories GÉNÉRIQUES parmi:
+   - Type: repo, tool, software, library, framework, extension
+   - Techno: backend, frontend, database, devops, cloud, mobile
+   - Domaine: development, productivity, security, data, ai
+
+IMPORTANT: Réponds UNIQUEMENT avec ce JSON (sans ```json ni backticks):
+{{"title": "titre simple", "description": "description courte", "tags": ["categorie1", "categorie2"]}}"""
+
+
+def generate_title_and_description(url: str, article_content: str):
+    """Utilise Gemini pour générer un titre et une description pertinents"""
+    cache_key = llm_cache.make_key(ARTICLE_PROMPT, GEMINI_MODEL, url, article_content)
+    return llm.client.coalesce(
+        cache_key, lambda: _cached_generation(cache_key, _gemini_title_and_description, url, article_content)
+    )
+
+
+def _cached_generation(cache_key: str, generate, *args):
+    """Cache LLM d'abord ; les appels concurrents de même clé partagent un seul appel Gemini"""
+    cached = llm_cache.cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    result = generate(*args)
+    if result:
+        llm_cache.cache.set(cache_key, GEMINI_MODEL, result)
+    return result
+
+
+def _gemini_title_and_description(url: str, article_content: str):
+    try:
+        prompt = ARTICLE_PROMPT.format(url=url, article_content=article_content)
+        
+        response = llm.client.generate(prompt)
+        metrics.log("gemini_response", level=logging.DEBUG, text=response)
+        
+        response_text = response.strip()
+        
+        response_text = re.sub(r'```json\s*', '', response_text)
+        response_text = re.sub(r'```\s*', '', response_text)
+        
+        result = json.loads(response_text)
+        return result
+    except json.JSONDecodeError as e:
+        metrics.log("gemini_invalid_json", level=logging.WARNING, error=str(e), text=response)
+        try:
+            cleaned = response_text.replace('\\"', '"').replace("'", '"')
+            result = json.loads(cleaned)
+            return result
+        except ValueError:
+            return None
+    except Exception as e:
+        metrics.log("gemini_error", level=logging.WARNING, error=repr(e), content_preview=article_content[:200])
+        return None
+
+
+def generate_resource_metadata(url: str, article_content: str, custom_description: str = None):
+    """Génère des métadonnées simples pour une ressource (repo, software, tool)"""
+    cache_key = llm_cache.make_key(
+        RESOURCE_PROMPT, GEMINI_MODEL, url, article_content[:1000], custom_description or ""
+    )
+    return llm.client.coalesce(
+        cache_key,
+        lambda: _cached_generation(cache_key, _gemini_resource_metadata, url, article_content, custom_description),
+    )
+
+
+def _gemini_resource_metadata(url: str, article_content: str, custom_description: str = None):
+    try:
+        # Si une description personnalisée est fournie, on l'utilise
+        desc_info = f"\nDescription fournie par l'utilisateur: {custom_description}" if custom_description else ""
+        
+        prompt = RESOURCE_PROMPT.format(url=url, desc_info=desc_info, article_content=article_content[:1000])
+        
+        response = llm.client.generate(prompt)
+        metrics.log("gemini_response", level=logging.DEBUG, text=response)
+        
+        # Extraire le JSON
+        response_text = response.strip()
+        response_text = re.sub(r'```json\s*', '', response_text)
+        response_text = re.sub(r'```\s*', '', response_text)
+        
+        return json.loads(response_text)
+    except Exception as e:
+        metrics.log("gemini_error", level=logging.WARNING, error=repr(e))
+        return None
+
+
+def find_link_by_canonical_url(canonical_url: str) -> models.Link | None:
+    with Session(engine) as session:
+        return crud.get_link_by_canonical_url(session, canonical_url)
+
+
+def content_hash(text: str | None) -> str:
+    """Empreinte du texte extrait normalisé (espaces, Unicode) : détecte les pages qui ont changé"""
+    return hashlib.sha256(llm_cache.normalize_content(text or "").encode("utf-8")).hexdigest()
+
+
+async def fetch_and_extract(url: str, url_only_fallback: bool = True) -> extraction.Extraction:
+    # Stratégie par domaine (API, oEmbed, OpenGraph), HTML simple sinon, Chromium en dernier recours
+    with metrics.span("fetch"):
+        html_content = await sources.fetch_page(url, url_only_fallback=url_only_fallback)
+
+    # Une seule passe sur le HTML : texte, titre, description et URL canonique.
+    # Le parsing est bloquant : on le sort de la boucle (comme l'appel Gemini)
+    with metrics.span("extraction", bytes=len(html_content)):
+        return await run_in_threadpool(extraction.extract, html_content)
+
+
+async def summarize(url: str, resource_type: str, article_content: str, custom_description: str | None = None) -> dict | None:
+    """Titre, description et tags générés par Gemini ; None si Gemini a échoué"""
+    # Pour les ressources on utilise un prompt plus simple
+    with metrics.span("llm"):
+        if resource_type == "resource":
+            return await run_in_threadpool(generate_resource_metadata, url, article_content, custom_description)
+        return await run_in_threadpool(generate_title_and_description, url, article_content)
+
+
+async def build_link(link: models.LinkCreate) -> models.Link:
+    """Exécute le pipeline complet pour un lien et retourne la ligne à insérer
+    (ou le lien existant si la page déclare une URL canonique déjà connue)"""
+    page = await fetch_and_extract(link.url)
+    article_content = page.text
+
+    canonical_url = urls.normalize_url(link.url)
+    declared_canonical = urls.resolve_canonical(page.canonical_url, link.url) if page.canonical_url else None
+    if declared_canonical and urls.normalize_url(declared_canonical) != canonical_url:
+        canonical_url = urls.normalize_url(declared_canonical)
+        existing = await run_in_threadpool(find_link_by_canonical_url, canonical_url)
+        if existing is not None:
+            # Doublon détecté après le fetch : on évite au moins l'appel Gemini
+            metrics.log("duplicate", link_id=existing.id, canonical_url=canonical_url)
+            return existing
+
+    metrics.log("extracted", url=link.url, content_length=len(article_content))
+
+    ai_result = await summarize(link.url, link.resource_type, article_content, link.description)
+    if ai_result:
+        title = ai_result.get("title")
+        description = ai_result.get("description")
+        tags = tagging.normalize_tags(ai_result.get("tags"))
+    else:
+        # Fallback sur les métadonnées de la page si Gemini échoue (déjà extraites, pas de second parsing)
+        title = page.title or FALLBACK_TITLE
+        description = page.description or FALLBACK_DESCRIPTION
+        tags = list(FALLBACK_TAGS)
+        metrics.fallback("llm_to_page_metadata", url=link.url)
+
+    return models.Link(
+        url=link.url,
+        canonical_url=canonical_url,
+        content=article_content,
+        content_hash=content_hash(article_content),
+        title=title,
+        description=description,
+        tags=tags,
+        source=link.source,
+        resource_type=link.resource_type
+    )
@@ -0,0 +1,127 @@
+"""
+Pool de workers qui draine la file des jobs d'ingestion (table ingestjob)
+"""
+import asyncio
+import logging
+import os
+import time
+from datetime import timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlmodel import Session
+
+import crud
+import embeddings
+import ingest
+import metrics
+import models
+import response_cache
+from database import engine
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_POLL_INTERVAL = float(os.getenv("INGEST_POLL_INTERVAL", "2"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+# Au-delà de ce délai, un job "running" est considéré comme abandonné (worker mort, redémarrage)
+INGEST_JOB_LEASE = timedelta(seconds=int(os.getenv("INGEST_JOB_LEASE", "600")))
+
+
+def claim_job() -> models.IngestJob | None:
+    with Session(engine) as session:
+        return crud.claim_next_job(session, lease=INGEST_JOB_LEASE, max_attempts=INGEST_MAX_ATTEMPTS)
+
+
+def fail_job(job_id: int, error: str, retry: bool) -> None:
+    with Session(engine) as session:
+        crud.fail_job(session, job_id=job_id, error=error, retry=retry)
+
+
+def complete_job(job_id: int, link: models.Link) -> None:
+    text = embeddings.link_text(link)  # lu avant le commit, qui expire l'objet
+    with metrics.span("db_insert"), Session(engine) as session:
+        job, created = crud.complete_job(session, job_id=job_id, link=link)
+    # Doublon (lien existant ou insertion concurrente) : rien de nouveau à indexer ni à invalider
+    if created:
+        response_cache.cache.invalidate(response_cache.LIST_TAG)
+        embeddings.index.index_links_safely([(job.link_id, text)])
+
+
+async def process_job(job: models.IngestJob) -> None:
+    """Exécute le pipeline d'ingestion pour un job réservé et enregistre le résultat"""
+    # Tous les logs et spans de ce job portent son id de corrélation
+    with metrics.correlation(f"job-{job.id}"):
+        started = time.perf_counter()
+        status = await _process_job(job)
+        metrics.JOBS.inc(status=status)
+        metrics.INGEST_SECONDS.observe(time.perf_counter() - started, outcome=status)
+        metrics.log("job_finished", status=status, url=job.url, attempt=job.attempts, seconds=round(time.perf_counter() - started, 3))
+
+
+async def _process_job(job: models.IngestJob) -> str:
+    link = models.LinkCreate.model_validate(job.payload)
+    try:
+        db_link = await ingest.build_link(link)
+    except ingest.FetchError as e:
+        metrics.log("job_failed", level=logging.WARNING, error=str(e))
+        await run_in_threadpool(fail_job, job.id, str(e), False)
+        return "failed"
+    except Exception as e:
+        retry = job.attempts < INGEST_MAX_ATTEMPTS
+        metrics.log("job_error", level=logging.WARNING, error=repr(e), attempt=job.attempts, max_attempts=INGEST_MAX_ATTEMPTS)
+        await run_in_threadpool(fail_job, job.id, str(e), retry)
+        return "retry" if retry else "failed"
+
+    await run_in_threadpool(complete_job, job.id, db_link)
+    return "done"
+
+
+class WorkerPool:
+    """Workers asyncio ; le travail bloquant (parsing, Gemini, DB) part dans le threadpool"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._tasks: list[asyncio.Task] = []
+        self._wakeup: asyncio.Event | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._run(n)) for n in range(self.size)]
+        metrics.log("workers_started", workers=self.size)
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self):
+        """Réveille les workers après un enqueue (sinon ils repassent au prochain poll)"""
+        if self._loop is not None:
+            # Appelé depuis la boucle par les endpoints async ; call_soon_threadsafe reste sûr depuis un thread
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self, n: int):
+        while True:
+            self._wakeup.clear()
+            try:
+                job = await run_in_threadpool(claim_job)
+            except Exception as e:
+                metrics.log("claim_failed", level=logging.ERROR, worker=n, error=repr(e))
+                job = None
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=INGEST_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                await process_job(job)
+            except Exception as e:
+                # Erreur DB en enregistrant le résultat : le bail expirera et le job sera repris
+                metrics.log("job_not_recorded", level=logging.ERROR, worker=n, job_id=job.id, error=repr(e))
+
+
+worker_pool = WorkerPool(size=INGEST_WORKERS)
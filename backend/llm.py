@@ -0,0 +1,193 @@
+"""
+Client Gemini central : un seul modèle par nom, limiteur token-bucket calé sur le quota,
+retries avec backoff exponentiel sur 429/5xx, timeout, coalescence des appels identiques
+et métriques (latence, tokens)
+"""
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, TypeVar
+
+import metrics
+
+GEMINI_MODEL = "gemini-2.5-flash"
+# Quota du projet (requêtes/minute) et rafale autorisée
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "10"))
+GEMINI_BURST = int(os.getenv("GEMINI_BURST", "3"))
+# Attente max d'un jeton : au-delà on bascule sur le fallback plutôt que d'empiler les requêtes
+GEMINI_MAX_QUEUE_WAIT = float(os.getenv("GEMINI_MAX_QUEUE_WAIT", "30"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "30"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+GEMINI_BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1"))
+GEMINI_BACKOFF_MAX = 30.0
+
+# SDK Gemini importé au premier appel (_load_sdk) : google.generativeai coûte ~1 s au démarrage,
+# payé pour rien par un process qui ne fait que servir l'API de lecture
+genai = None
+RETRYABLE_ERRORS: tuple[type[Exception], ...] = ()
+
+
+def _load_sdk():
+    global genai, RETRYABLE_ERRORS
+    if genai is not None:
+        return
+    from google.api_core import exceptions as google_exceptions
+    import google.generativeai
+
+    RETRYABLE_ERRORS = (
+        google_exceptions.ResourceExhausted,  # 429 quota
+        google_exceptions.TooManyRequests,
+        google_exceptions.InternalServerError,
+        google_exceptions.BadGateway,
+        google_exceptions.ServiceUnavailable,
+        google_exceptions.GatewayTimeout,
+        google_exceptions.DeadlineExceeded,
+    )
+    genai = google.generativeai
+
+T = TypeVar("T")
+
+
+class LLMUnavailable(Exception):
+    """Pas de jeton disponible à temps, ou erreurs répétées : l'appelant doit utiliser son fallback"""
+
+
+class TokenBucket:
+    """Limiteur thread-safe : `rate_per_minute` jetons par minute, au plus `burst` d'avance"""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+
+class LLMClient:
+    def __init__(self):
+        self._models: dict[str, "genai.GenerativeModel"] = {}
+        self._bucket = TokenBucket(GEMINI_RPM, GEMINI_BURST)
+        self._lock = threading.Lock()
+        self._in_flight: dict[str, Future] = {}
+        self._stats = {
+            "calls": 0,
+            "errors": 0,
+            "retries": 0,
+            "rate_limited": 0,  # abandons faute de jeton (fallback immédiat)
+            "coalesced": 0,  # appels servis par une requête identique déjà en cours
+            "latency_seconds_total": 0.0,
+            "latency_seconds_max": 0.0,
+            "prompt_tokens": 0,
+            "output_tokens": 0,
+        }
+        self._configured = False
+
+    def _count(self, name: str, value=1):
+        with self._lock:
+            self._stats[name] += value
+
+    def _model(self, model_name: str) -> "genai.GenerativeModel":
+        with self._lock:
+            if not self._configured:
+                _load_sdk()
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+                self._configured = True
+            if model_name not in self._models:
+                self._models[model_name] = genai.GenerativeModel(model_name)
+            return self._models[model_name]
+
+    def generate(self, prompt: str, model_name: str = GEMINI_MODEL) -> str:
+        """Texte de la réponse ; lève LLMUnavailable ou l'erreur Gemini après les retries"""
+        model = self._model(model_name)
+        for attempt in range(GEMINI_MAX_RETRIES + 1):
+            if not self._bucket.acquire(timeout=GEMINI_MAX_QUEUE_WAIT):
+                self._count("rate_limited")
+                raise LLMUnavailable(f"No Gemini quota available within {GEMINI_MAX_QUEUE_WAIT}s")
+
+            started = time.perf_counter()
+            try:
+                response = model.generate_content(prompt, request_options={"timeout": GEMINI_TIMEOUT})
+                text = response.text
+            except RETRYABLE_ERRORS as e:
+                self._record_latency(started)
+                if attempt == GEMINI_MAX_RETRIES:
+                    self._count("errors")
+                    raise
+                delay = min(GEMINI_BACKOFF_MAX, GEMINI_BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+                metrics.log("gemini_retry", level=logging.WARNING, error=type(e).__name__, attempt=attempt + 1, delay=round(delay, 2))
+                self._count("retries")
+                time.sleep(delay)
+                continue
+            except Exception:
+                self._record_latency(started)
+                self._count("errors")
+                raise
+
+            self._record_latency(started)
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None:
+                self._count("prompt_tokens", getattr(usage, "prompt_token_count", 0) or 0)
+                self._count("output_tokens", getattr(usage, "candidates_token_count", 0) or 0)
+            return text
+
+    def _record_latency(self, started: float):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["latency_seconds_total"] += elapsed
+            self._stats["latency_seconds_max"] = max(self._stats["latency_seconds_max"], elapsed)
+
+    def coalesce(self, key: str, fn: Callable[[], T]) -> T:
+        """Exécute fn une seule fois pour des appels concurrents de même clé (même contenu)"""
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+            else:
+                self._stats["coalesced"] += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._in_flight)
+            stats["available_tokens"] = round(self._bucket.tokens, 2)
+        stats["latency_seconds_avg"] = stats["latency_seconds_total"] / stats["calls"] if stats["calls"] else 0.0
+        stats["rpm_limit"] = GEMINI_RPM
+        return stats
+
+
+client = LLMClient()
@@ -0,0 +1,109 @@
+"""
+Cache persistant des réponses Gemini, adressé par le contenu : une même page
+(repost, retry /rf) ne déclenche qu'un seul appel au modèle
+"""
+import hashlib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+import crud
+import metrics
+import models
+from database import engine
+
+LLM_CACHE_TTL = timedelta(seconds=int(os.getenv("LLM_CACHE_TTL", str(30 * 24 * 3600))))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+# En dessous de cette taille le contenu n'identifie pas la page (page vide, rendu raté) :
+# l'URL entre alors dans la clé pour ne pas partager un résultat entre pages différentes
+LLM_CACHE_MIN_CONTENT = 200
+# L'éviction (TTL + LRU) est faite toutes les N écritures plutôt qu'à chaque fois
+EVICT_EVERY = 50
+
+
+def normalize_content(text: str) -> str:
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def make_key(template: str, model: str, url: str, content: str, *extra: str) -> str:
+    content = normalize_content(content)
+    parts = [template, model, content, *extra]
+    if len(content) < LLM_CACHE_MIN_CONTENT:
+        parts.append(url)
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, ttl: timedelta, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "errors": 0}
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self._stats[name] += n
+
+    def get(self, key: str) -> dict | None:
+        try:
+            with Session(engine) as session:
+                entry = crud.get_llm_cache_entry(session, key)
+                if entry is None:
+                    self._count("misses")
+                    return None
+                if entry.created_at < datetime.utcnow() - self.ttl:
+                    self._count("expired")
+                    self._count("misses")
+                    return None
+                result = entry.result
+                crud.touch_llm_cache_entry(session, entry)
+        except Exception as e:
+            # Le cache ne doit jamais faire échouer une ingestion
+            self._count("errors")
+            metrics.log("llm_cache_failed", level=logging.WARNING, operation="get", error=repr(e))
+            return None
+
+        self._count("hits")
+        return result
+
+    def set(self, key: str, model: str, result: dict) -> None:
+        entry = models.LLMCacheEntry(key=key, model=model, result=result)
+        try:
+            with Session(engine) as session:
+                crud.save_llm_cache_entry(session, entry)
+                with self._lock:
+                    self._writes += 1
+                    evict = self._writes % EVICT_EVERY == 0
+                if evict:
+                    deleted = crud.evict_llm_cache(
+                        session,
+                        expired_before=datetime.utcnow() - self.ttl,
+                        max_entries=self.max_entries,
+                    )
+                    self._count("evicted", deleted)
+        except Exception as e:
+            self._count("errors")
+            metrics.log("llm_cache_failed", level=logging.WARNING, operation="set", error=repr(e))
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        stats["max_entries"] = self.max_entries
+        try:
+            with Session(engine) as session:
+                stats["entries"] = crud.count_llm_cache_entries(session)
+        except Exception:
+            stats["entries"] = None
+        return stats
+
+
+cache = LLMCache(ttl=LLM_CACHE_TTL, max_entries=LLM_CACHE_MAX_ENTRIES)
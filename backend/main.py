@@ -1,23 +1,56 @@
-from fastapi import FastAPI, Depends, HTTPException
-from sqlmodel import Session
-from typing import List
-import requests
-from bs4 import BeautifulSoup
-import os
-import google.generativeai as genai
-from fastapi.middleware.cors import CORSMiddleware
-from playwright.sync_api import sync_playwright
 import time
 
+# Chronomètre du démarrage à froid : les imports ci-dessous en font partie
+IMPORTS_STARTED = time.perf_counter()
+
+import json
+import logging
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from fastapi.middleware.cors import CORSMiddleware
+from datetime import datetime
+
+import batch
+import browser
 import crud
+import embeddings
+import fetcher
+import jobs
+import llm
+import llm_cache
+import metrics
+import migrate
 import models
-from database import engine
+import refresh
+import response_cache
+import search
+import sources
+import tagging
+import transfer
+import urls
+from database import READ_ONLY, async_engine
+
+metrics.startup.record("imports", time.perf_counter() - IMPORTS_STARTED)
+
+# Sérialisation directe en JSON (pydantic-core) du corps mis en cache
+LINK_LIST_ADAPTER = TypeAdapter(List[models.LinkRead])
+TAG_FACETS_ADAPTER = TypeAdapter(List[models.TagFacet])
+
 
-# Configuration Gemini
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+def require_writable():
+    if READ_ONLY:
+        raise HTTPException(status_code=503, detail="Read-only instance")
 
-def get_session():
-    with Session(engine) as session:
+
+async def get_session():
+    # expire_on_commit=False : pas de rechargement implicite (impossible en async) après commit
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
         yield session
 
 
@@ -30,161 +63,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 
 @app.on_event("startup")
-def on_startup():
-    models.SQLModel.metadata.create_all(engine)
-
-
-def extract_article_content(html_content):
-    """Extrait le contenu principal de l'article"""
-    soup = BeautifulSoup(html_content, "html.parser")
-    
-    # Supprimer les scripts et styles
-    for script in soup(["script", "style"]):
-        script.decompose()
-    
-    # Chercher des tags
-    article = soup.find("article") or soup.find("main") or soup.find("div", class_=["content", "post", "article"])
-    
-    if article:
-        text = article.get_text()
-    else:
-        text = soup.get_text()
-    
-
-    lines = (line.strip() for line in text.splitlines())
-    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-    text = ' '.join(chunk for chunk in chunks if chunk)
-    
-    return text[:3000]  # Limiter à 3000 caractères pour Gemini ! IMPORTANT !
-
-
-def generate_title_and_description(url: str, article_content: str):
-    """Utilise Gemini pour générer un titre et une description pertinents"""
-    try:
-        import json
-        import re
-        
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
-        prompt = f"""Tu es un assistant qui résume des articles web de manière concise et pertinente.
-
-URL: {url}
-
-Contenu de la page:
-{article_content}
-
-INSTRUCTIONS STRICTES:
-1. Génère un titre COURT (3-8 mots maximum) qui capture l'essence de l'article
-2. Génère une description CONCISE (1-2 phrases, max 150 caractères) 
-3. Extrait 2-4 CATÉGORIES GÉNÉRALES (pas de mots spécifiques). Exemples de bonnes catégories:
-   - Technologie: backend, frontend, devops, cloud, mobile, web, ia, data
-   - Développement: tutorial, guide, documentation, tips
-   - Domaine: software, hardware, design, business, productivity
-   - Thème: security, performance, architecture, testing
-4. Sois DIRECT et FACTUEL, pas de formulations marketing
-5. Les tags doivent être GÉNÉRIQUES et RÉUTILISABLES (pas de noms propres, pas de mots trop spécifiques)
-
-IMPORTANT: Réponds UNIQUEMENT avec ce JSON (sans ```json ni backticks):
-{{"title": "votre titre ici", "description": "votre description ici", "tags": ["categorie1", "categorie2", "categorie3"]}}"""
-        
-        response = model.generate_content(prompt)
-        print(f"Gemini raw response: {response.text}")
-        
-        response_text = response.text.strip()
-        
-        response_text = re.sub(r'```json\s*', '', response_text)
-        response_text = re.sub(r'```\s*', '', response_text)
-        
-        result = json.loads(response_text)
-        print(f"Gemini parsed result: {result}")
-        return result
-    except json.JSONDecodeError as e:
-        print(f"Erreur parsing JSON: {e}")
-        print(f"Raw text: {response.text if 'response' in locals() else 'N/A'}")
-        try:
-            import ast
-            cleaned = response_text.replace('\\"', '"').replace("'", '"')
-            result = json.loads(cleaned)
-            return result
-        except:
-            print(f"Article content preview: {article_content[:200]}")
-            return None
-    except Exception as e:
-        print(f"Erreur Gemini: {e}")
-        print(f"Article content preview: {article_content[:200]}")
-        return None
-
-
-def scrape_with_playwright(url: str) -> str:
-    """Scrape une page dynamique avec Playwright (pour Twitter/X, etc.)"""
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            )
-            page = context.new_page()
-            
-            page.goto(url, wait_until="domcontentloaded", timeout=60000)
-            
-            time.sleep(3)
-            
-            html_content = page.content()
-            browser.close()
-            return html_content
-    except Exception as e:
-        print(f"Erreur Playwright: {e}")
-        return None
-
-
-def generate_resource_metadata(url: str, article_content: str, custom_description: str = None):
-    """Génère des métadonnées simples pour une ressource (repo, software, tool)"""
-    try:
-        import json
-        import re
-        
-        model = genai.GenerativeModel("gemini-2.5-flash")
-        
-        # Si une description personnalisée est fournie, on l'utilise
-        desc_info = f"\nDescription fournie par l'utilisateur: {custom_description}" if custom_description else ""
-        
-        prompt = f"""Tu es un assistant qui catégorise des ressources techniques (repos GitHub, software, outils, etc.).
-
-URL: {url}{desc_info}
-
-Contenu de la page:
-{article_content[:1000]}
-
-INSTRUCTIONS:
-1. Génère un titre TRÈS SIMPLE et COURT (3-6 mots max) qui identifie la ressource
-   Exemples: "Repo GitHub Rust", "VSCode Extension", "PostgreSQL Database", "Docker Tool"
-2. Génère une description CONCISE (1 phrase courte, max 100 caractères)
-3. Attribue 1-3 catégories GÉNÉRIQUES parmi:
-   - Type: repo, tool, software, library, framework, extension
-   - Techno: backend, frontend, database, devops, cloud, mobile
-   - Domaine: development, productivity, security, data, ai
-
-IMPORTANT: Réponds UNIQUEMENT avec ce JSON (sans ```json ni backticks):
-{{"title": "titre simple", "description": "description courte", "tags": ["categorie1", "categorie2"]}}"""
-        
-        response = model.generate_content(prompt)
-        print(f"Gemini resource response: {response.text}")
-        
-        # Extraire le JSON
-        response_text = response.text.strip()
-        response_text = re.sub(r'```json\s*', '', response_text)
-        response_text = re.sub(r'```\s*', '', response_text)
-        
-        result = json.loads(response_text)
-        print(f"Gemini resource result: {result}")
-        return result
-    except Exception as e:
-        print(f"Erreur Gemini resource: {e}")
-        return None
+async def on_startup():
+    # Le schéma est migré au déploiement (python migrate.py), pas à chaque démarrage de worker
+    with metrics.startup.phase("schema_check"):
+        pending = await run_in_threadpool(migrate.pending_revisions)
+    if pending and migrate.MIGRATE_ON_STARTUP and not READ_ONLY:
+        with metrics.startup.phase("migrations"):
+            await run_in_threadpool(migrate.upgrade)
+    elif pending:
+        metrics.log("schema_outdated", level=logging.WARNING, pending=pending)
+    with metrics.startup.phase("embeddings"):
+        embeddings.index.start()
+    if not READ_ONLY:
+        # Pile d'ingestion : Playwright et le SDK Gemini ne sont importés qu'ici (ou au premier appel)
+        with metrics.startup.phase("fetcher"):
+            await fetcher.client.start()
+        with metrics.startup.phase("browser"):
+            await browser.manager.start()
+        with metrics.startup.phase("workers"):
+            jobs.worker_pool.start()
+            refresh.scheduler.start()
+    metrics.log("startup_finished", read_only=READ_ONLY, **metrics.startup.get_stats())
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await refresh.scheduler.stop()
+    await jobs.worker_pool.stop()
+    await browser.manager.stop()
+    await fetcher.client.stop()
+    await async_engine.dispose()
 
 
 @app.get("/")
@@ -192,97 +105,242 @@ def read_root():
     return {"message": "Knowledge Ingester is running!"}
 
 
-@app.post("/ingest/", response_model=models.LinkRead)
-def ingest_link(link: models.LinkCreate, session: Session = Depends(get_session)):
-    # Déterminer si on doit use Playwright (sites JS comme twitter)
-    use_playwright = any(domain in link.url for domain in ["twitter.com", "x.com", "instagram.com"])
-    
-    html_content = None
-    
-    if use_playwright:
-        print(f"Using Playwright for: {link.url}")
-        html_content = scrape_with_playwright(link.url)
-        
-        if not html_content:
-            print("Playwright failed, trying requests as fallback...")
-            try:
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-                }
-                response = requests.get(link.url, timeout=10, headers=headers)
-                response.raise_for_status()
-                html_content = response.content
-            except:
-                # Si les deux échouent, on génère du contenu minimal avec Gemini basé sur l'URL
-                print("Both Playwright and requests failed, using URL-based generation")
-                html_content = f"<html><body><p>URL: {link.url}</p></body></html>".encode()
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    """Exposition Prometheus : durées par étape, replis, jobs, plus les compteurs de /stats en jauges"""
+    return PlainTextResponse(metrics.render(read_stats()), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/stats")
+def read_stats():
+    """Métriques internes (saturation du pool Playwright, fetch HTTP, cache Gemini...) pour dimensionner le déploiement"""
+    return {
+        "browser": browser.manager.get_stats(),
+        "fetcher": fetcher.client.get_stats(),
+        "sources": sources.get_stats(),
+        "llm": llm.client.get_stats(),
+        "llm_cache": llm_cache.cache.get_stats(),
+        "response_cache": response_cache.cache.get_stats(),
+        "embeddings": embeddings.index.get_stats(),
+        "refresh": refresh.scheduler.get_stats(),
+        "startup": {**metrics.startup.get_stats(), "read_only": READ_ONLY},
+    }
+
+
+@app.post("/ingest/", response_model=models.IngestJobRead, status_code=202, dependencies=[Depends(require_writable)])
+async def ingest_link(link: models.LinkCreate, response: Response, session: AsyncSession = Depends(get_session)):
+    try:
+        canonical_url = urls.normalize_url(link.url)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid URL: {e}")
+
+    # Lien déjà connu : on le renvoie directement, sans scraping ni appel Gemini
+    existing = await crud.get_link_by_canonical_url_async(session, canonical_url)
+    if existing is not None:
+        job = await crud.create_job_async(session=session, link=link, canonical_url=canonical_url, link_id=existing.id)
+        response.status_code = 200
+        return models.IngestJobRead.model_validate(job, update={"link": existing})
+
+    # Même URL déjà en file : on renvoie le job existant plutôt que d'en créer un second
+    job = await crud.get_active_job_async(session, canonical_url=canonical_url)
+    if job is None:
+        job = await crud.create_job_async(session=session, link=link, canonical_url=canonical_url)
+        jobs.worker_pool.notify()
+    return job
+
+
+@app.post("/ingest/batch", dependencies=[Depends(require_writable)])
+async def ingest_batch(request: Request, concurrency: int = batch.BATCH_CONCURRENCY):
+    """Ingère une liste de LinkCreate (tableau JSON ou flux NDJSON) ; une ligne NDJSON de résultat par lien"""
+    # Le corps est lu avant de démarrer la réponse : StreamingResponse écoute ensuite receive()
+    # pour détecter les déconnexions et ne laisserait plus lire la requête
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = batch.iter_ndjson(await request.body())
     else:
         try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
-            response = requests.get(link.url, timeout=10, headers=headers)
-            response.raise_for_status()
-            html_content = response.content
-        except requests.RequestException as e:
-            raise HTTPException(status_code=400, detail=f"Could not fetch URL: {e}")
-
-    article_content = extract_article_content(html_content)
-    
-    print(f"URL: {link.url}")
-    print(f"Article content length: {len(article_content)}")
-    
-    # Générer titre/description avec Gemini
-    # Pour les ressources on utilise un prompt plus simple
-    if link.resource_type == "resource":
-        ai_result = generate_resource_metadata(link.url, article_content, link.description)
+            payload = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=422, detail="Body must be a JSON array of links")
+        items = batch.iter_items(payload)
+
+    return StreamingResponse(batch.ingest_batch(items, concurrency), media_type="application/x-ndjson")
+
+
+@app.get("/export")
+async def export_links(
+    format: str = Query(default="ndjson", pattern="^(ndjson|parquet)$"),
+    since: Optional[datetime] = None,
+):
+    """Exporte tous les liens (contenu compris) en flux, lus par curseur serveur ; `since` filtre sur created_at"""
+    if format == "parquet":
+        if not transfer.PARQUET_AVAILABLE:
+            raise HTTPException(status_code=501, detail="Parquet export requires pyarrow")
+        body, media_type = transfer.export_parquet(since), transfer.PARQUET_MEDIA_TYPE
     else:
-        ai_result = generate_title_and_description(link.url, article_content)
-    
-    if ai_result:
-        title = ai_result.get("title")
-        description = ai_result.get("description")
-        tags = ai_result.get("tags", [])
-        print(f"AI generated - Title: {title}, Description: {description}")
+        body, media_type = transfer.export_ndjson(since), "application/x-ndjson"
+    headers = {"Content-Disposition": f'attachment; filename="links.{format}"'}
+    return StreamingResponse(body, media_type=media_type, headers=headers)
+
+
+@app.post("/import", dependencies=[Depends(require_writable)])
+async def import_links(request: Request):
+    """Importe un export (NDJSON ou Parquet selon le Content-Type) sans scraping ni Gemini.
+    Les URLs déjà présentes sont ignorées ; renvoie le bilan de l'import"""
+    content_type = request.headers.get("content-type", "")
+    if "parquet" in content_type:
+        if not transfer.PARQUET_AVAILABLE:
+            raise HTTPException(status_code=501, detail="Parquet import requires pyarrow")
+        result = await transfer.import_parquet(request.stream())
     else:
-        # Fallback sur la méthode classique si Gemini échoue
-        soup = BeautifulSoup(html_content, "html.parser")
-        title = soup.title.string if soup.title else "No title found"
-        description_tag = soup.find("meta", attrs={"name": "description"})
-        description = description_tag["content"] if description_tag else "No description"
-        tags = ["web"]
-        print(f"Fallback - Title: {title}, Description: {description}")
-
-    db_link = models.Link(
-        url=link.url,
-        title=title,
-        description=description,
-        tags=tags,
-        source=link.source,
-        resource_type=link.resource_type
-    )
-    
-    db_link = crud.create_link(session=session, link=db_link)
-    return db_link
+        result = await transfer.import_ndjson(request.stream())
+    if result["created"]:
+        response_cache.cache.invalidate(response_cache.LIST_TAG)
+    return result
+
+
+@app.get("/jobs/{job_id}", response_model=models.IngestJobRead)
+async def read_job(job_id: int, session: AsyncSession = Depends(get_session)):
+    job = await crud.get_job_by_id_async(session, job_id=job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    link = await crud.get_link_by_id_async(session, link_id=job.link_id) if job.link_id else None
+    return models.IngestJobRead.model_validate(job, update={"link": link})
 
 
 @app.get("/links/", response_model=List[models.LinkRead])
-def read_links(skip: int = 0, limit: int = 100, session: Session = Depends(get_session)):
-    links = crud.get_links(session, skip=skip, limit=limit)
-    return links
+async def read_links(
+    request: Request,
+    skip: int = 0,
+    limit: int = Query(default=100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    read: Optional[bool] = None,
+    resource_type: Optional[str] = None,
+    source: Optional[str] = None,
+    tags: List[str] = Query(default=[]),
+    tags_match: str = Query(default="all", pattern="^(all|any)$"),
+    fields: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """Liens du plus récent au plus ancien.
+    Page suivante : repasser l'en-tête X-Next-Cursor en `cursor=` (skip reste accepté mais coûte O(skip)).
+    `tags=rust&tags=backend` : liens portant tous ces tags (normalisés, "IA" = "ai") ;
+    avec `tags_match=any`, liens portant au moins l'un d'eux.
+    `fields=id,title,url` ne renvoie que ces champs.
+    Réponse mise en cache avec un ETag : `If-None-Match` renvoie 304 si rien n'a changé."""
+    cache_key = response_cache.cache.key(request, response_cache.LIST_TAG)
+    cached = response_cache.cache.get(cache_key)
+    if cached is not None:
+        return response_cache.cache.respond(request, cached)
+
+    try:
+        position = crud.decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    projection = [name.strip() for name in fields.split(",") if name.strip()] if fields else None
+    if projection:
+        unknown = set(projection) - set(models.LinkRead.model_fields)
+        if unknown:
+            raise HTTPException(status_code=422, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+
+    links = await crud.get_links_async(
+        session, skip=skip, limit=limit, cursor=position,
+        read=read, resource_type=resource_type, source=source, fields=projection,
+        tags=tagging.normalize_tags(tags), tags_any=tags_match == "any",
+    )
+
+    headers = {}
+    if len(links) == limit:
+        last = links[-1]
+        headers["X-Next-Cursor"] = crud.encode_cursor(last["created_at"], last["id"]) if projection else crud.encode_cursor(last.created_at, last.id)
+
+    if projection:
+        # Projection : seuls les champs demandés sont sérialisés
+        body = json.dumps(
+            jsonable_encoder([{name: row[name] for name in projection} for row in links]),
+            ensure_ascii=False, separators=(",", ":"),
+        ).encode()
+    else:
+        body = LINK_LIST_ADAPTER.dump_json([models.LinkRead.model_validate(link) for link in links])
+
+    cached = response_cache.cache.store(cache_key, body, headers)
+    return response_cache.cache.respond(request, cached)
+
+
+@app.get("/search", response_model=List[models.SearchResult])
+async def search_links(
+    q: Optional[str] = None,
+    tags: List[str] = Query(default=[]),
+    resource_type: Optional[str] = None,
+    mode: str = Query(default="text", pattern="^(text|semantic)$"),
+    limit: int = Query(default=20, ge=1, le=100),
+    offset: int = Query(default=0, ge=0),
+    session: AsyncSession = Depends(get_session),
+):
+    """Recherche plein texte (titre, description, contenu) classée par pertinence, filtrable par tags.
+    `mode=semantic` classe par similarité de sens (rank = cosinus) plutôt que par mots communs"""
+    tags = tagging.normalize_tags(tags)
+    q = q.strip() if q else None
+    if mode == "text":
+        return await search.search_links_async(session, q=q, tags=tags, resource_type=resource_type, limit=limit, offset=offset)
+    if not q:
+        raise HTTPException(status_code=422, detail="Semantic search requires q")
+    k = (offset + limit) * (search.SEMANTIC_OVERSAMPLE if tags or resource_type else 1)
+    ranked = await run_in_threadpool(embeddings.index.query, q, k)
+    return await search.semantic_search_async(session, ranked, tags=tags, resource_type=resource_type, limit=limit, offset=offset)
+
+
+@app.get("/tags", response_model=List[models.TagFacet])
+async def read_tags(
+    request: Request,
+    limit: int = Query(default=100, ge=1, le=1000),
+    prefix: Optional[str] = None,
+    session: AsyncSession = Depends(get_session),
+):
+    """Nuage de tags : nombre de liens par tag, du plus fréquent au moins fréquent (compteurs précalculés)"""
+    cache_key = response_cache.cache.key(request, response_cache.LIST_TAG)
+    cached = response_cache.cache.get(cache_key)
+    if cached is None:
+        facets = await crud.get_tag_facets_async(session, limit=limit, prefix=tagging.normalize_tag(prefix) if prefix else None)
+        body = TAG_FACETS_ADAPTER.dump_json([models.TagFacet(name=tag.name, count=tag.link_count) for tag in facets])
+        cached = response_cache.cache.store(cache_key, body)
+    return response_cache.cache.respond(request, cached)
 
 
 @app.get("/links/{link_id}", response_model=models.LinkRead)
-def read_link(link_id: int, session: Session = Depends(get_session)):
-    db_link = crud.get_link_by_id(session, link_id=link_id)
+async def read_link(link_id: int, request: Request, session: AsyncSession = Depends(get_session)):
+    cache_key = response_cache.cache.key(request, response_cache.link_tag(link_id))
+    cached = response_cache.cache.get(cache_key)
+    if cached is None:
+        db_link = await crud.get_link_by_id_async(session, link_id=link_id)
+        if db_link is None:
+            raise HTTPException(status_code=404, detail="Link not found")
+        cached = response_cache.cache.store(cache_key, models.LinkRead.model_validate(db_link).model_dump_json().encode())
+    return response_cache.cache.respond(request, cached)
+
+
+@app.get("/links/{link_id}/related", response_model=List[models.SearchResult])
+async def read_related_links(
+    link_id: int,
+    limit: int = Query(default=10, ge=1, le=100),
+    session: AsyncSession = Depends(get_session),
+):
+    """Liens les plus proches par similarité de contenu (rank = cosinus)"""
+    db_link = await crud.get_link_by_id_async(session, link_id=link_id)
     if db_link is None:
         raise HTTPException(status_code=404, detail="Link not found")
-    return db_link
+    ranked = await run_in_threadpool(embeddings.index.related, db_link, limit)
+    return await search.semantic_search_async(session, ranked, tags=[], limit=limit)
 
 
-@app.delete("/links/{link_id}")
-def delete_link(link_id: int, session: Session = Depends(get_session)):
-    success = crud.delete_link(session, link_id=link_id)
+@app.delete("/links/{link_id}", dependencies=[Depends(require_writable)])
+async def delete_link(link_id: int, session: AsyncSession = Depends(get_session)):
+    success = await crud.delete_link_async(session, link_id=link_id)
     if not success:
         raise HTTPException(status_code=404, detail="Link not found")
+    response_cache.cache.invalidate(response_cache.LIST_TAG, response_cache.link_tag(link_id))
+    embeddings.index.remove(link_id)
     return {"message": "Link deleted successfully"}
@@ -0,0 +1,202 @@
+"""
+Instrumentation du pipeline d'ingestion : compteurs et histogrammes exportés au format
+texte Prometheus sur /metrics, spans de durée par étape (fetch, rendu, extraction, LLM, DB)
+et logs JSON portant l'id de corrélation de l'ingestion en cours
+"""
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+
+# Secondes : du parsing (ms) au rendu Playwright / appel Gemini (dizaines de secondes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# Id de l'ingestion en cours ; suit les tâches asyncio et run_in_threadpool (contextvars)
+correlation_id: ContextVar[str | None] = ContextVar("correlation_id", default=None)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = buckets
+        # clé de labels -> (compteurs par bucket, somme, nombre)
+        self._values: dict[tuple[str, ...], tuple[list[int], float, int]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            counts, total, count = self._values.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value, count + 1)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._values.items()):
+                for bound, bucket_count in zip(self.buckets, counts):
+                    le = 'le="%s"' % bound
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {bucket_count}")
+                le = 'le="+Inf"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "ingest_stage_seconds", "Durée de chaque étape du pipeline d'ingestion", ("stage", "outcome"),
+)
+INGEST_SECONDS = Histogram(
+    "ingest_duration_seconds", "Durée totale d'une ingestion (fetch → insertion)", ("outcome",),
+)
+FALLBACKS = Counter(
+    "ingest_fallbacks_total", "Replis du pipeline (API → HTML, Playwright → HTTP, Gemini → métadonnées de la page...)", ("kind",),
+)
+JOBS = Counter("ingest_jobs_total", "Jobs d'ingestion terminés par statut", ("status",))
+
+REGISTRY = [STAGE_SECONDS, INGEST_SECONDS, FALLBACKS, JOBS]
+
+
+class _JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "event": record.getMessage(),
+            "ingest_id": correlation_id.get(),
+            **getattr(record, "fields", {}),
+        }
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+logger = logging.getLogger("ingest")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stdout)
+    _handler.setFormatter(_JsonFormatter())
+    logger.addHandler(_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+
+
+def log(event: str, level: int = logging.INFO, **fields):
+    """Ligne de log JSON : {"event": ..., "ingest_id": ..., **fields}"""
+    logger.log(level, event, extra={"fields": fields})
+
+
+def new_correlation_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:12]}"
+
+
+@contextmanager
+def correlation(value: str):
+    token = correlation_id.set(value)
+    try:
+        yield value
+    finally:
+        correlation_id.reset(token)
+
+
+@contextmanager
+def span(stage: str, **fields):
+    """Mesure une étape : histogramme ingest_stage_seconds{stage, outcome} + log de fin d'étape"""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage, outcome=outcome)
+        log("stage", level=logging.DEBUG, stage=stage, outcome=outcome, seconds=round(elapsed, 4), **fields)
+
+
+def fallback(kind: str, **fields):
+    FALLBACKS.inc(kind=kind)
+    log("fallback", level=logging.WARNING, kind=kind, **fields)
+
+
+class StartupReport:
+    """Durée de chaque phase du démarrage (imports, vérification du schéma, navigateur...) :
+    exposée dans /stats (donc en jauges sur /metrics) pour suivre le temps de démarrage à froid"""
+
+    def __init__(self):
+        self._phases: dict[str, float] = {}
+
+    def record(self, phase: str, seconds: float):
+        self._phases[phase] = round(seconds, 4)
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    def get_stats(self) -> dict:
+        stats = {f"{phase}_seconds": seconds for phase, seconds in self._phases.items()}
+        stats["total_seconds"] = round(sum(self._phases.values()), 4)
+        return stats
+
+
+startup = StartupReport()
+
+
+def render(extra_gauges: dict[str, dict] | None = None) -> str:
+    """Exposition texte Prometheus ; `extra_gauges` = {composant: stats} exportés en jauges"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for component, stats in (extra_gauges or {}).items():
+        for key, value in sorted(stats.items()):
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                lines.append(f"ingester_{component}_{key} {value}")
+    return "\n".join(lines) + "\n"
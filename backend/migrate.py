@@ -1,37 +1,304 @@
 """
-Script de migration pour ajouter la colonne resource_type
+Migrations versionnées du schéma : chaque révision est appliquée une seule fois et
+enregistrée dans la table schema_migrations. À lancer au déploiement, avant les workers :
+
+    cd backend
+    python migrate.py              # applique les révisions en attente
+    python migrate.py --status     # révisions appliquées / en attente
+
+Les index sur les tables existantes sont créés en ligne (CREATE INDEX CONCURRENTLY sous
+PostgreSQL) et les backfills passent par lots : un déploiement ne verrouille pas la table link.
+Un verrou consultatif empêche deux déploiements simultanés d'appliquer les mêmes révisions
 """
+import argparse
+import logging
 import os
-from dotenv import load_dotenv
-import psycopg2
-
-load_dotenv()
-
-DATABASE_URL = os.getenv("DATABASE_URL")
-
-conn = psycopg2.connect(DATABASE_URL)
-cur = conn.cursor()
-
-try:
-    print("Adding resource_type column...")
-    cur.execute("""
-        ALTER TABLE link 
-        ADD COLUMN IF NOT EXISTS resource_type VARCHAR(20) DEFAULT 'article';
-    """)
-    
-    print("Updating existing records...")
-    cur.execute("""
-        UPDATE link 
-        SET resource_type = 'article' 
-        WHERE resource_type IS NULL;
-    """)
-    
-    conn.commit()
-    print("✅ Migration completed successfully!")
-    
-except Exception as e:
-    print(f"❌ Error during migration: {e}")
-    conn.rollback()
-finally:
-    cur.close()
-    conn.close()
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable
+
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlmodel import Session
+
+import crud
+import metrics
+import models
+import search
+import tagging
+import urls
+from database import engine
+
+MIGRATIONS_TABLE = "schema_migrations"
+# Applique les révisions au démarrage de l'API (dev / SQLite). En production : python migrate.py
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "false").lower() in ("1", "true", "yes")
+# Un ALTER TABLE qui attend un verrou bloque toutes les requêtes derrière lui : on abandonne vite
+MIGRATE_LOCK_TIMEOUT = os.getenv("MIGRATE_LOCK_TIMEOUT", "5s")
+MIGRATE_BATCH_SIZE = int(os.getenv("MIGRATE_BATCH_SIZE", "5000"))
+# Clé du verrou consultatif PostgreSQL (pg_advisory_lock)
+ADVISORY_LOCK_KEY = 72_615_001
+
+
+@dataclass
+class Revision:
+    id: str
+    description: str
+    apply: Callable[[Engine], None]
+
+
+REVISIONS: list[Revision] = []
+
+
+def revision(revision_id: str, description: str):
+    """Enregistre une révision ; l'ordre de déclaration est l'ordre d'application"""
+    def register(apply: Callable[[Engine], None]):
+        REVISIONS.append(Revision(revision_id, description, apply))
+        return apply
+    return register
+
+
+# --- Outils des révisions : idempotents, pour reprendre une révision interrompue ---
+
+def _is_postgres(engine: Engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def _columns(engine: Engine, table: str) -> set[str]:
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+
+@contextmanager
+def _ddl(engine: Engine):
+    with engine.begin() as conn:
+        if _is_postgres(engine):
+            conn.execute(text(f"SET LOCAL lock_timeout = '{MIGRATE_LOCK_TIMEOUT}'"))
+        yield conn
+
+
+def add_column(engine: Engine, table: str, name: str, definition: str):
+    # PostgreSQL 11+ : une colonne avec DEFAULT constant est ajoutée sans réécrire la table
+    if name not in _columns(engine, table):
+        with _ddl(engine) as conn:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {definition}"))
+
+
+def create_index(engine: Engine, name: str, table: str, definition: str, unique: bool = False):
+    """`definition` : "(created_at, id)", "USING GIN (...)"... CONCURRENTLY sous PostgreSQL"""
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if not _is_postgres(engine):
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON {table} {definition}"))
+        return
+
+    # CONCURRENTLY est interdit dans une transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        valid = conn.execute(text(
+            "SELECT i.indisvalid FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid WHERE c.relname = :name"
+        ), {"name": name}).scalar()
+        if valid:
+            return
+        if valid is False:
+            # Construction concurrente interrompue : l'index invalide existe mais ne sert à rien
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+        conn.execute(text(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}"))
+
+
+def drop_index(engine: Engine, name: str):
+    concurrently = "CONCURRENTLY " if _is_postgres(engine) else ""
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS {name}"))
+
+
+def update_in_batches(engine: Engine, table: str, assignments: str, condition: str):
+    """UPDATE par tranches d'id : des transactions courtes plutôt qu'un verrou sur toute la table"""
+    with engine.connect() as conn:
+        max_id = conn.execute(text(f"SELECT MAX(id) FROM {table}")).scalar() or 0
+    for start in range(0, max_id + 1, MIGRATE_BATCH_SIZE):
+        with engine.begin() as conn:
+            conn.execute(
+                text(f"UPDATE {table} SET {assignments} WHERE id >= :start AND id < :end AND ({condition})"),
+                {"start": start, "end": start + MIGRATE_BATCH_SIZE},
+            )
+
+
+# --- Révisions ---
+
+@revision("0001_tables", "Tables absentes, créées depuis les modèles")
+def create_tables(engine: Engine):
+    # Ne touche pas aux tables existantes : leurs colonnes et index viennent des révisions suivantes
+    models.SQLModel.metadata.create_all(engine)
+
+
+@revision("0002_link_resource_type_read", "Colonnes link.resource_type et link.read")
+def add_resource_type_and_read(engine: Engine):
+    add_column(engine, "link", "resource_type", "VARCHAR(20) DEFAULT 'article'")
+    update_in_batches(engine, "link", "resource_type = 'article'", "resource_type IS NULL")
+    add_column(engine, "link", "read", "BOOLEAN DEFAULT FALSE NOT NULL")
+
+
+@revision("0003_canonical_url", "URL canonique (dédoublonnage) sur link et ingestjob")
+def add_canonical_url(engine: Engine):
+    add_column(engine, "link", "canonical_url", "VARCHAR")
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT id, url FROM link WHERE canonical_url IS NULL ORDER BY id")).all()
+        taken = set(conn.execute(text("SELECT canonical_url FROM link WHERE canonical_url IS NOT NULL")).scalars())
+    for start in range(0, len(rows), MIGRATE_BATCH_SIZE):
+        with engine.begin() as conn:
+            for link_id, url in rows[start:start + MIGRATE_BATCH_SIZE]:
+                try:
+                    canonical_url = urls.normalize_url(url)
+                except ValueError:
+                    # URL historique inexploitable : laissée sans URL canonique
+                    continue
+                # Doublons historiques : seul le plus ancien reçoit l'URL canonique
+                if canonical_url in taken:
+                    continue
+                taken.add(canonical_url)
+                conn.execute(
+                    text("UPDATE link SET canonical_url = :canonical_url WHERE id = :id"),
+                    {"canonical_url": canonical_url, "id": link_id},
+                )
+    create_index(engine, "ix_link_canonical_url", "link", "(canonical_url)", unique=True)
+
+    add_column(engine, "ingestjob", "canonical_url", "VARCHAR")
+    create_index(engine, "ix_ingestjob_canonical_url", "ingestjob", "(canonical_url)")
+
+
+@revision("0004_search", "Contenu extrait et index plein texte")
+def add_search_index(engine: Engine):
+    add_column(engine, "link", "content", "TEXT")
+    if _is_postgres(engine):
+        create_index(engine, "ix_link_search", "link", f"USING GIN (({search.POSTGRES_SEARCH_VECTOR}))")
+    else:
+        search.ensure_search_index(engine)
+
+
+@revision("0005_pagination_index", "Index (created_at, id) de la pagination par curseur")
+def add_pagination_index(engine: Engine):
+    create_index(engine, "ix_link_created_at_id", "link", "(created_at, id)")
+
+
+@revision("0006_refresh", "Colonnes content_hash et refreshed_at du re-crawl")
+def add_refresh_columns(engine: Engine):
+    add_column(engine, "link", "content_hash", "VARCHAR")
+    add_column(engine, "link", "refreshed_at", "TIMESTAMP")
+    # Jamais re-fetché : l'âge du lien compte depuis son ingestion
+    update_in_batches(engine, "link", "refreshed_at = created_at", "refreshed_at IS NULL")
+    create_index(engine, "ix_link_refreshed_at", "link", "(refreshed_at)")
+
+
+@revision("0007_tags", "Tags normalisés (tag, linktag) et compteurs de facettes")
+def add_tag_tables(engine: Engine):
+    models.SQLModel.metadata.create_all(engine, tables=[models.Tag.__table__, models.LinkTag.__table__])
+    # Remplacé par linktag pour le filtrage par tag
+    drop_index(engine, "ix_link_tags")
+
+    after_id = 0
+    while True:
+        with Session(engine) as session:
+            rows = session.execute(
+                select(models.Link.id, models.Link.tags)
+                .where(models.Link.id > after_id).order_by(models.Link.id).limit(MIGRATE_BATCH_SIZE)
+            ).all()
+            if not rows:
+                break
+            for link_id, raw_tags in rows:
+                names = tagging.normalize_tags(raw_tags)
+                if names != raw_tags:
+                    session.execute(update(models.Link).where(models.Link.id == link_id).values(tags=names))
+                # Idempotent : seuls les écarts avec linktag sont écrits
+                crud.set_link_tags(session, link_id, names)
+            session.commit()
+            after_id = rows[-1][0]
+
+
+@revision("0008_embedding_updated_at", "Horodatage des vecteurs (relecture incrémentale de l'index sémantique)")
+def add_embedding_updated_at(engine: Engine):
+    # Vecteurs existants : tous relus au chargement complet, la valeur par défaut suffit
+    add_column(engine, "linkembedding", "updated_at", "TIMESTAMP DEFAULT '1970-01-01 00:00:00' NOT NULL")
+    create_index(engine, "ix_linkembedding_updated_at", "linkembedding", "(updated_at)")
+
+
+# --- Exécution ---
+
+def _ensure_migrations_table(engine: Engine):
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+            "revision VARCHAR PRIMARY KEY, applied_at TIMESTAMP NOT NULL, duration_ms INTEGER NOT NULL)"
+        ))
+
+
+def applied_revisions(engine: Engine = engine) -> dict[str, object]:
+    """{révision: date d'application}"""
+    if not inspect(engine).has_table(MIGRATIONS_TABLE):
+        return {}
+    with engine.connect() as conn:
+        return dict(conn.execute(text(f"SELECT revision, applied_at FROM {MIGRATIONS_TABLE}")).all())
+
+
+def pending_revisions(engine: Engine = engine) -> list[str]:
+    applied = applied_revisions(engine)
+    return [rev.id for rev in REVISIONS if rev.id not in applied]
+
+
+@contextmanager
+def _migration_lock(engine: Engine):
+    """Verrou consultatif tenu sur une connexion dédiée pendant toute la migration (PostgreSQL)"""
+    if not _is_postgres(engine):
+        yield
+        return
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        try:
+            yield
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": ADVISORY_LOCK_KEY})
+
+
+def upgrade(engine: Engine = engine) -> list[str]:
+    """Applique les révisions en attente, dans l'ordre ; renvoie les révisions appliquées"""
+    done = []
+    with _migration_lock(engine):
+        _ensure_migrations_table(engine)
+        # Relu sous le verrou : un autre déploiement a pu migrer pendant l'attente
+        applied = applied_revisions(engine)
+        for rev in REVISIONS:
+            if rev.id in applied:
+                continue
+            started = time.perf_counter()
+            try:
+                rev.apply(engine)
+            except Exception as e:
+                metrics.log("migration_failed", level=logging.ERROR, revision=rev.id, error=repr(e))
+                raise
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            with engine.begin() as conn:
+                conn.execute(
+                    text(f"INSERT INTO {MIGRATIONS_TABLE} (revision, applied_at, duration_ms) VALUES (:revision, CURRENT_TIMESTAMP, :duration_ms)"),
+                    {"revision": rev.id, "duration_ms": duration_ms},
+                )
+            metrics.log("migration_applied", revision=rev.id, description=rev.description, duration_ms=duration_ms)
+            done.append(rev.id)
+    return done
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--status", action="store_true", help="Affiche l'état des révisions sans rien appliquer")
+    args = parser.parse_args()
+
+    if args.status:
+        applied = applied_revisions()
+        for rev in REVISIONS:
+            state = f"applied {applied[rev.id]}" if rev.id in applied else "pending"
+            print(f"{rev.id:<32} {state:<36} {rev.description}")
+        return
+
+    done = upgrade()
+    print(f"✅ {len(done)} revision(s) applied" if done else "✅ Schema up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from sqlmodel import Field, SQLModel
-from sqlalchemy import String, JSON
+from sqlalchemy import String, JSON, LargeBinary, Text, Index
 from datetime import datetime
 
 
@@ -13,9 +13,18 @@ class LinkBase(SQLModel):
 
 
 class Link(LinkBase, table=True):
+    __table_args__ = (
+        # Pagination par curseur (ORDER BY created_at DESC, id DESC)
+        Index("ix_link_created_at_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
+    canonical_url: Optional[str] = Field(default=None, unique=True, index=True)
     tags: Optional[List[str]] = Field(default=None, sa_type=JSON)
+    content: Optional[str] = Field(default=None, sa_type=Text)  # Texte extrait, pour la recherche
+    content_hash: Optional[str] = None  # sha256 du texte normalisé : le refresh ne resummarise que si il change
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    refreshed_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, index=True)  # dernier re-fetch
     read: bool = Field(default=False, nullable=False)
 
 
@@ -25,6 +34,98 @@ class LinkCreate(LinkBase):
 
 class LinkRead(LinkBase):
     id: int
+    canonical_url: Optional[str] = None
     tags: Optional[List[str]] = None
     created_at: datetime
     read: bool
+
+
+class SearchResult(LinkRead):
+    rank: float
+
+
+class LinkExport(LinkBase):
+    """Ligne de GET /export et POST /import : tout le lien sauf l'id, réattribué à l'import"""
+    canonical_url: Optional[str] = None
+    tags: Optional[List[str]] = None
+    content: Optional[str] = None
+    content_hash: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    refreshed_at: Optional[datetime] = None
+    read: bool = False
+
+
+class IngestJob(SQLModel, table=True):
+    """Job d'ingestion persistant, traité en arrière-plan par le pool de workers"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    url: str
+    canonical_url: Optional[str] = Field(default=None, index=True)
+    payload: dict = Field(sa_type=JSON)
+    status: str = Field(default="pending", index=True)  # pending | running | done | failed
+    attempts: int = Field(default=0, nullable=False)
+    link_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    updated_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class IngestJobRead(SQLModel):
+    id: int
+    url: str
+    status: str
+    attempts: int
+    link_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+    link: Optional[LinkRead] = None
+
+
+class FetchCache(SQLModel, table=True):
+    """Validateurs HTTP (ETag / Last-Modified) et corps compressé des URLs déjà récupérées"""
+    url: str = Field(primary_key=True)
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content: bytes = Field(sa_type=LargeBinary)  # zlib
+    fetched_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+
+
+class LLMCacheEntry(SQLModel, table=True):
+    """Résultat Gemini indexé par hash(prompt, modèle, contenu normalisé)"""
+    key: str = Field(primary_key=True)
+    model: str
+    result: dict = Field(sa_type=JSON)
+    created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
+    last_used_at: datetime = Field(default_factory=datetime.utcnow, nullable=False, index=True)
+    hits: int = Field(default=0, nullable=False)
+
+
+class LinkEmbedding(SQLModel, table=True):
+    """Vecteur float32 d'un lien (recherche sémantique) ; l'index en mémoire est reconstruit depuis cette table"""
+    link_id: int = Field(primary_key=True)
+    model: str = Field(index=True)  # ex. "hashing-256" : un changement de modèle invalide les vecteurs
+    vector: bytes = Field(sa_type=LargeBinary)
+    # Horodatage de chaque écriture (ingestion, refresh) : repère des relectures incrémentales de l'index
+    updated_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+
+class Tag(SQLModel, table=True):
+    """Tag normalisé (tagging.py) ; link_count est maintenu à chaque ajout / retrait dans linktag"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str = Field(unique=True, index=True)
+    link_count: int = Field(default=0, nullable=False)
+
+
+class LinkTag(SQLModel, table=True):
+    __table_args__ = (
+        # Filtre par tag : parcours des liens d'un tag sans lire la table link
+        Index("ix_linktag_tag_id_link_id", "tag_id", "link_id"),
+    )
+
+    link_id: int = Field(primary_key=True)
+    tag_id: int = Field(primary_key=True)
+
+
+class TagFacet(SQLModel):
+    name: str
+    count: int
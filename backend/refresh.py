@@ -0,0 +1,170 @@
+"""
+Re-crawl incrémental des liens : les liens dégradés (Gemini en échec à l'ingestion, titre
+"No title found", tags ["web"]) et les plus anciens sont re-fetchés par petits lots, en
+requêtes conditionnelles (ETag / Last-Modified via fetchcache). Gemini n'est rappelé que si
+le contenu a changé, ou pour réparer un lien dégradé. Le refresh cède la place aux jobs
+d'ingestion : il ne tourne que quand la file est vide
+"""
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import String, cast, or_
+from sqlmodel import Session
+
+import crud
+import embeddings
+import ingest
+import metrics
+import models
+import response_cache
+import tagging
+from database import engine
+
+REFRESH_ENABLED = os.getenv("REFRESH_ENABLED", "true").lower() in ("1", "true", "yes")
+# Un lot de REFRESH_BATCH_SIZE liens toutes les REFRESH_INTERVAL secondes, traités un par un
+REFRESH_INTERVAL = float(os.getenv("REFRESH_INTERVAL", "300"))
+REFRESH_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", "10"))
+# Âge à partir duquel un lien sain est re-fetché
+REFRESH_MAX_AGE = timedelta(days=int(os.getenv("REFRESH_MAX_AGE_DAYS", "30")))
+# Délai entre deux tentatives sur un lien dégradé (quota Gemini épuisé, site en panne...)
+REFRESH_DEGRADED_RETRY = timedelta(hours=float(os.getenv("REFRESH_DEGRADED_RETRY_HOURS", "6")))
+
+# Lien issu du repli "métadonnées de la page" ou sans contenu extrait
+DEGRADED = or_(
+    models.Link.title == ingest.FALLBACK_TITLE,
+    models.Link.description == ingest.FALLBACK_DESCRIPTION,
+    cast(models.Link.tags, String) == json.dumps(ingest.FALLBACK_TAGS),
+    models.Link.content.is_(None),
+    models.Link.content == "",
+)
+
+
+def is_degraded(link: models.Link) -> bool:
+    return (
+        link.title == ingest.FALLBACK_TITLE
+        or link.description == ingest.FALLBACK_DESCRIPTION
+        or link.tags == ingest.FALLBACK_TAGS
+        or not link.content
+    )
+
+
+def claim_batch(limit: int) -> list[tuple[models.Link, datetime]]:
+    now = datetime.utcnow()
+    with Session(engine) as session:
+        return crud.claim_links_to_refresh(
+            session, stale_before=now - REFRESH_MAX_AGE, degraded_before=now - REFRESH_DEGRADED_RETRY,
+            degraded=DEGRADED, limit=limit,
+        )
+
+
+def release_claims(claims: list[tuple[models.Link, datetime]]) -> None:
+    with Session(engine) as session:
+        crud.release_refresh_claims(session, claims)
+
+
+def live_jobs() -> int:
+    with Session(engine) as session:
+        return crud.count_active_jobs(session)
+
+
+def save_refresh(link: models.Link, values: dict) -> None:
+    with metrics.span("db_update"), Session(engine) as session:
+        crud.update_link_content(session, link.id, **values)
+    response_cache.cache.invalidate(response_cache.LIST_TAG, response_cache.link_tag(link.id))
+    if "content" in values:
+        for name, value in values.items():
+            setattr(link, name, value)
+        embeddings.index.index_links_safely([(link.id, embeddings.link_text(link))])
+
+
+async def refresh_link(link: models.Link) -> str:
+    """Re-fetch un lien déjà réservé (refreshed_at posé) ; renvoie unchanged | updated | failed"""
+    degraded = is_degraded(link)
+    try:
+        # Sans repli "URL seule" : Gemini résumerait l'URL et écraserait le vrai contenu
+        page = await ingest.fetch_and_extract(link.url, url_only_fallback=False)
+    except ingest.FetchError as e:
+        metrics.log("refresh_fetch_failed", level=logging.WARNING, error=str(e))
+        return "failed"
+    if not page.text.strip():
+        # Page vide : on ne remplace pas un contenu existant par du vide
+        return "failed"
+
+    new_hash = ingest.content_hash(page.text)
+    old_hash = link.content_hash or ingest.content_hash(link.content)
+    if new_hash == old_hash and not degraded:
+        if link.content_hash is None:
+            await run_in_threadpool(save_refresh, link, {"content_hash": new_hash})
+        return "unchanged"
+
+    # Pas de description utilisateur à repasser : elle a été remplacée par celle de Gemini
+    ai_result = await ingest.summarize(link.url, link.resource_type, page.text)
+    if not ai_result:
+        # Gemini toujours indisponible : on garde l'ancien contenu et le hash pour réessayer plus tard
+        metrics.fallback("refresh_llm_failed", url=link.url)
+        return "failed"
+
+    await run_in_threadpool(save_refresh, link, {
+        "content": page.text,
+        "content_hash": new_hash,
+        "title": ai_result.get("title"),
+        "description": ai_result.get("description"),
+        "tags": tagging.normalize_tags(ai_result.get("tags")),
+    })
+    return "updated"
+
+
+class RefreshScheduler:
+    def __init__(self, interval: float, batch_size: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self._task: asyncio.Task | None = None
+        self._stats = {"runs": 0, "refreshed": 0, "unchanged": 0, "updated": 0, "failed": 0, "yielded": 0}
+
+    def start(self):
+        if REFRESH_ENABLED and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def run_once(self) -> int:
+        """Un lot ; s'arrête dès que des jobs d'ingestion attendent"""
+        if await run_in_threadpool(live_jobs):
+            self._stats["yielded"] += 1
+            return 0
+        claims = await run_in_threadpool(claim_batch, self.batch_size)
+        for position, (link, _) in enumerate(claims):
+            if position and await run_in_threadpool(live_jobs):
+                # Les liens non traités sont rendus : ils restent en tête de la file au prochain passage
+                await run_in_threadpool(release_claims, claims[position:])
+                self._stats["yielded"] += 1
+                break
+            with metrics.correlation(f"refresh-{link.id}"):
+                outcome = await refresh_link(link)
+                metrics.log("refresh_finished", outcome=outcome, url=link.url)
+            self._stats["refreshed"] += 1
+            self._stats[outcome] += 1
+        self._stats["runs"] += 1
+        return len(claims)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                metrics.log("refresh_error", level=logging.ERROR, error=repr(e))
+
+    def get_stats(self) -> dict:
+        return {**self._stats, "enabled": REFRESH_ENABLED and self._task is not None}
+
+
+scheduler = RefreshScheduler(REFRESH_INTERVAL, REFRESH_BATCH_SIZE)
@@ -0,0 +1,141 @@
+"""
+Cache des réponses des endpoints de lecture (/links/, /links/{id}) : corps JSON déjà sérialisé,
+ETag fort et réponse 304 si le client a déjà la bonne version. Invalidation par tags
+("links" pour les listes, "link:{id}" pour un lien) via des compteurs de génération
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fastapi import Request, Response
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+# Filet de sécurité si plusieurs process servent l'API (l'invalidation est locale au process)
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "60"))
+
+LIST_TAG = "links"
+
+
+def link_tag(link_id: int) -> str:
+    return f"link:{link_id}"
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+class MemoryBackend:
+    """LRU en mémoire ; une autre implémentation (Redis...) doit offrir get / set / incr / generation"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, CachedResponse]] = OrderedDict()
+        # Compteurs hors LRU : une génération évincée ressusciterait des entrées périmées
+        self._generations: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: CachedResponse, ttl: float):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, name: str) -> int:
+        with self._lock:
+            return self._generations.get(name, 0)
+
+    def incr(self, name: str):
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+
+    def size(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip().removeprefix("W/") for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: float, enabled: bool = True):
+        self.backend = backend
+        self.ttl = ttl
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def key(self, request: Request, *tags: str) -> str:
+        """Clé = chemin + query triée + générations des tags : invalider un tag rend ses clés inaccessibles"""
+        generations = ",".join(f"{tag}@{self.backend.generation(tag)}" for tag in tags)
+        query = "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+        return f"{generations}|{request.url.path}?{query}"
+
+    def get(self, key: str) -> CachedResponse | None:
+        if not self.enabled:
+            return None
+        cached = self.backend.get(key)
+        self._count("hits" if cached is not None else "misses")
+        return cached
+
+    def store(self, key: str, body: bytes, headers: dict[str, str] | None = None) -> CachedResponse:
+        cached = CachedResponse(body=body, etag=make_etag(body), headers=dict(headers or {}))
+        if self.enabled:
+            self.backend.set(key, cached, self.ttl)
+        return cached
+
+    def invalidate(self, *tags: str):
+        """Appelé après chaque écriture (thread-safe : les workers écrivent depuis le threadpool)"""
+        for tag in tags:
+            self.backend.incr(tag)
+        self._count("invalidations")
+
+    def respond(self, request: Request, cached: CachedResponse) -> Response:
+        # no-cache : le navigateur revalide à chaque fois, la 304 ne coûte ni DB ni sérialisation
+        headers = {**cached.headers, "ETag": cached.etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, cached.etag):
+            self._count("not_modified")
+            return Response(status_code=304, headers=headers)
+        return Response(content=cached.body, media_type="application/json", headers=headers)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["entries"] = self.backend.size()
+        return stats
+
+
+cache = ResponseCache(MemoryBackend(RESPONSE_CACHE_MAX_ENTRIES), ttl=RESPONSE_CACHE_TTL, enabled=RESPONSE_CACHE_ENABLED)
@@ -0,0 +1,148 @@
+"""
+Recherche plein texte sur les liens (titre, description, contenu extrait) :
+tsvector + index GIN sous PostgreSQL, table FTS5 en SQLite pour le local.
+Le mode sémantique classe par similarité des vecteurs (embeddings.py)
+"""
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+import crud
+import models
+
+# L'expression doit être identique dans l'index et dans les requêtes pour que PostgreSQL l'utilise.
+# Config 'simple' : le contenu mélange français et anglais, on évite le stemming d'une seule langue.
+POSTGRES_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(content, '')), 'C')"
+)
+
+# Table FTS5 "external content" synchronisée par triggers avec la table link
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS link_fts USING fts5(
+        title, description, content, content='link', content_rowid='id'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS link_fts_insert AFTER INSERT ON link BEGIN
+        INSERT INTO link_fts(rowid, title, description, content)
+        VALUES (new.id, new.title, new.description, new.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS link_fts_delete AFTER DELETE ON link BEGIN
+        INSERT INTO link_fts(link_fts, rowid, title, description, content)
+        VALUES ('delete', old.id, old.title, old.description, old.content);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS link_fts_update AFTER UPDATE ON link BEGIN
+        INSERT INTO link_fts(link_fts, rowid, title, description, content)
+        VALUES ('delete', old.id, old.title, old.description, old.content);
+        INSERT INTO link_fts(rowid, title, description, content)
+        VALUES (new.id, new.title, new.description, new.content);
+    END""",
+]
+
+
+def ensure_search_index(engine: Engine):
+    """Crée la table FTS5 et ses triggers s'ils n'existent pas (idempotent, SQLite).
+    Sous PostgreSQL l'index GIN ix_link_search est créé en ligne par migrate.py"""
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            created = not conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE name = 'link_fts'")
+            ).first()
+            for statement in SQLITE_DDL:
+                conn.execute(text(statement))
+            if created:
+                # Indexe les liens insérés avant la création de la table FTS
+                conn.execute(text("INSERT INTO link_fts(link_fts) VALUES ('rebuild')"))
+        conn.commit()
+
+
+def _fts5_query(q: str) -> str:
+    """Chaque mot devient un terme FTS5 littéral (pas d'erreur de syntaxe sur les saisies utilisateur)"""
+    terms = ['"{}"'.format(term.replace('"', '""')) for term in q.split()]
+    return " ".join(terms)
+
+
+def _search_query(dialect: str, q: str | None, tags: list[str], resource_type: str | None, limit: int, offset: int) -> tuple[str, dict]:
+    params = {"limit": limit, "offset": offset}
+    filters = []
+    # Requête sans aucun terme (espaces seuls) : simple liste filtrée, pas de MATCH "" invalide
+    q = q.strip() if q else None
+
+    if resource_type:
+        filters.append("link.resource_type = :resource_type")
+        params["resource_type"] = resource_type
+
+    # Un sous-ensemble par tag via l'index ix_linktag_tag_id_link_id (même SQL pour les deux bases)
+    for i, tag in enumerate(tags):
+        filters.append(
+            f"link.id IN (SELECT linktag.link_id FROM linktag JOIN tag ON tag.id = linktag.tag_id WHERE tag.name = :tag{i})"
+        )
+        params[f"tag{i}"] = tag
+
+    if q and dialect == "postgresql":
+        params["q"] = q
+        where = " AND ".join([f"({POSTGRES_SEARCH_VECTOR}) @@ query", *filters])
+        sql = f"""
+            SELECT link.id, ts_rank_cd({POSTGRES_SEARCH_VECTOR}, query) AS rank
+            FROM link, websearch_to_tsquery('simple', :q) AS query
+            WHERE {where}
+            ORDER BY rank DESC, link.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    elif q:
+        params["q"] = _fts5_query(q)
+        where = " AND ".join(["link_fts MATCH :q", *filters])
+        # bm25 : plus petit = plus pertinent ; poids titre > description > contenu
+        sql = f"""
+            SELECT link.id, -bm25(link_fts, 10.0, 4.0, 1.0) AS rank
+            FROM link_fts JOIN link ON link.id = link_fts.rowid
+            WHERE {where}
+            ORDER BY rank DESC, link.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+    else:
+        where = " AND ".join(filters) or "1 = 1"
+        sql = f"""
+            SELECT link.id, 0.0 AS rank FROM link
+            WHERE {where}
+            ORDER BY link.created_at DESC, link.id DESC
+            LIMIT :limit OFFSET :offset
+        """
+
+    return sql, params
+
+
+def _ranked_results(ranked: list[tuple[int, float]], links: list[models.Link]) -> list[models.SearchResult]:
+    by_id = {link.id: link for link in links}
+    return [
+        models.SearchResult.model_validate(by_id[link_id], update={"rank": rank})
+        for link_id, rank in ranked
+        if link_id in by_id
+    ]
+
+
+async def search_links_async(session: AsyncSession, q: str | None, tags: list[str], resource_type: str | None = None, limit: int = 20, offset: int = 0) -> list[models.SearchResult]:
+    sql, params = _search_query(session.bind.dialect.name, q, tags, resource_type, limit, offset)
+    ranked = [(row[0], float(row[1])) for row in await session.execute(text(sql), params)]
+    if not ranked:
+        return []
+    links = (await session.exec(
+        select(models.Link).where(models.Link.id.in_([link_id for link_id, _ in ranked]))
+    )).all()
+    return _ranked_results(ranked, links)
+
+
+# Sur-échantillonnage des voisins quand des filtres écartent une partie des candidats
+SEMANTIC_OVERSAMPLE = 4
+
+
+async def semantic_search_async(session: AsyncSession, ranked: list[tuple[int, float]], tags: list[str], resource_type: str | None = None, limit: int = 20, offset: int = 0) -> list[models.SearchResult]:
+    """Résultats de l'index vectoriel (link_id, cosinus) filtrés par type et tags, puis paginés"""
+    if not ranked:
+        return []
+    links = await crud.get_links_by_ids_async(session, [link_id for link_id, _ in ranked], resource_type=resource_type)
+    if tags:
+        links = [link for link in links if set(tags).issubset(link.tags or [])]
+    return _ranked_results(ranked, links)[offset:offset + limit]
@@ -0,0 +1,190 @@
+"""
+Stratégies de récupération par domaine : API / oEmbed / OpenGraph quand le site en propose,
+fetch HTML simple sinon, Chromium seulement en dernier recours. Chaque stratégie renvoie du HTML
+(éventuellement synthétisé) pour que l'extraction reste la même pour toutes les sources
+"""
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass
+from html import escape
+from typing import Awaitable, Callable
+from urllib.parse import quote, urlparse
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+import browser
+import extraction
+import fetcher
+import metrics
+
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+# User-Agent des crawlers d'aperçu : Instagram leur sert les balises OpenGraph sans mur de login
+PREVIEW_USER_AGENT = "facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uatext.php)"
+
+
+class FetchError(Exception):
+    """L'URL n'a pas pu être récupérée (erreur définitive, pas de retry)"""
+
+
+@dataclass
+class Source:
+    name: str
+    domains: tuple[str, ...]
+    # Renvoie le HTML, ou None pour passer à la suite (Chromium ou fetch HTML)
+    fetch: Callable[[str], Awaitable[bytes | None]]
+    # Site rendu en JavaScript : le HTML brut est inutile, Chromium en dernier recours
+    needs_browser: bool = False
+
+    def matches(self, host: str) -> bool:
+        return any(host == domain or host.endswith("." + domain) for domain in self.domains)
+
+
+def synthesize_html(title: str | None, description: str | None, text: str | None, canonical_url: str | None = None) -> bytes:
+    """Page minimale lue par extraction.py comme n'importe quelle page"""
+    head = []
+    if title:
+        head.append(f"<title>{escape(title)}</title>")
+    if description:
+        head.append(f'<meta name="description" content="{escape(description)}">')
+    if canonical_url:
+        head.append(f'<link rel="canonical" href="{escape(canonical_url)}">')
+    body = f"<article><pre>{escape(text)}</pre></article>" if text else ""
+    return f"<html><head>{''.join(head)}</head><body>{body}</body></html>".encode()
+
+
+async def fetch_html(url: str, headers: dict | None = None) -> bytes:
+    """Récupère le HTML brut via le client HTTP partagé"""
+    try:
+        result = await fetcher.client.fetch(url, headers=headers)
+    except httpx.HTTPError as e:
+        raise FetchError(f"Could not fetch URL: {e}")
+    return result.content
+
+
+async def _fetch_json(url: str, headers: dict | None = None) -> dict | None:
+    try:
+        result = await fetcher.client.fetch(url, headers=headers)
+        return json.loads(result.content)
+    except (httpx.HTTPError, ValueError) as e:
+        metrics.log("api_fetch_failed", level=logging.WARNING, api_url=url, error=repr(e))
+        return None
+
+
+async def fetch_x(url: str) -> bytes | None:
+    """Tweets via l'oEmbed public (pas de JavaScript, pas de compte)"""
+    data = await _fetch_json(f"https://publish.twitter.com/oembed?omit_script=true&dnt=true&url={quote(url, safe='')}")
+    if not data or not data.get("html"):
+        return None
+    # Le HTML oEmbed est un <blockquote> : on n'en garde que le texte
+    tweet = extraction.extract(data["html"]).text
+    author = data.get("author_name") or "X"
+    return synthesize_html(f"Post by {author}", tweet[:200], tweet, canonical_url=data.get("url"))
+
+
+async def fetch_instagram(url: str) -> bytes | None:
+    """Posts Instagram via leurs balises OpenGraph"""
+    try:
+        content = await fetch_html(url, headers={"User-Agent": PREVIEW_USER_AGENT})
+    except FetchError:
+        return None
+    page = await run_in_threadpool(extraction.extract, content)
+    if not page.description:
+        return None  # mur de login : pas de métadonnées exploitables
+    return synthesize_html(page.title, page.description, page.description, canonical_url=page.canonical_url)
+
+
+async def fetch_github(url: str) -> bytes | None:
+    """Repos GitHub via l'API : description, topics et README brut"""
+    parts = [part for part in urlparse(url).path.split("/") if part]
+    if len(parts) != 2:
+        return None  # issues, PRs, gists... : la page HTML suffit
+    owner, repo = parts[0], parts[1].removesuffix(".git")
+    headers = {"Accept": "application/vnd.github+json"}
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+
+    api_url = f"https://api.github.com/repos/{owner}/{repo}"
+    info, readme = await asyncio.gather(
+        _fetch_json(api_url, headers),
+        _fetch_readme(f"{api_url}/readme", {**headers, "Accept": "application/vnd.github.raw"}),
+    )
+    if info is None:
+        return None
+
+    description = info.get("description") or ""
+    topics = ", ".join(info.get("topics") or [])
+    text = "\n".join(filter(None, [
+        description,
+        f"Language: {info['language']}" if info.get("language") else None,
+        f"Topics: {topics}" if topics else None,
+        readme,
+    ]))
+    return synthesize_html(info.get("full_name") or f"{owner}/{repo}", description, text, canonical_url=info.get("html_url"))
+
+
+async def _fetch_readme(url: str, headers: dict) -> str | None:
+    try:
+        result = await fetcher.client.fetch(url, headers=headers)
+    except httpx.HTTPError:
+        return None
+    return result.content[:extraction.TEXT_BUDGET * 4].decode("utf-8", errors="replace")
+
+
+SOURCES = [
+    Source("x", ("twitter.com", "x.com"), fetch_x, needs_browser=True),
+    Source("instagram", ("instagram.com",), fetch_instagram, needs_browser=True),
+    Source("github", ("github.com",), fetch_github),
+]
+
+_stats = {"browser_renders": 0, "html_fetches": 0, **{f"{source.name}_hits": 0 for source in SOURCES}}
+
+
+def source_for(url: str) -> Source | None:
+    host = (urlparse(url).hostname or "").lower()
+    return next((source for source in SOURCES if source.matches(host)), None)
+
+
+async def fetch_page(url: str, url_only_fallback: bool = True) -> bytes:
+    """Stratégie du domaine, puis fetch HTML ; Chromium seulement pour les sites JavaScript
+    dont la stratégie a échoué. Si rien n'a marché : page minimale "URL seule", ou FetchError
+    avec `url_only_fallback=False` (refresh : ne pas écraser un contenu existant)"""
+    source = source_for(url)
+    if source is not None:
+        with metrics.span(f"source:{source.name}"):
+            content = await source.fetch(url)
+        if content:
+            _stats[f"{source.name}_hits"] += 1
+            return content
+
+    if source is None or not source.needs_browser:
+        if source is not None:
+            metrics.fallback(f"{source.name}_to_http", url=url)
+        _stats["html_fetches"] += 1
+        with metrics.span("http_fetch"):
+            return await fetch_html(url)
+
+    metrics.fallback(f"{source.name}_to_browser", url=url)
+    with metrics.span("render"):
+        content = await browser.manager.render(url)
+    if content:
+        _stats["browser_renders"] += 1
+        return content
+
+    metrics.fallback("browser_to_http", url=url)
+    try:
+        _stats["html_fetches"] += 1
+        with metrics.span("http_fetch"):
+            return await fetch_html(url)
+    except FetchError:
+        if not url_only_fallback:
+            raise
+        # Si tout échoue, on génère du contenu minimal avec Gemini basé sur l'URL
+        metrics.fallback("http_to_url_only", url=url)
+        return f"<html><body><p>URL: {escape(url)}</p></body></html>".encode()
+
+
+def get_stats() -> dict:
+    return dict(_stats)
@@ -0,0 +1,73 @@
+"""
+Normalisation des tags générés par Gemini ("IA", "ia", "AI" -> "ai") : appliquée à l'ingestion,
+au refresh et aux filtres de recherche pour que le stockage (tables tag / linktag) et les
+facettes de GET /tags ne contiennent qu'une forme par tag
+"""
+import json
+import os
+import re
+import unicodedata
+
+# Variantes fréquentes dans les réponses Gemini -> forme canonique
+DEFAULT_ALIASES = {
+    "ia": "ai",
+    "intelligence-artificielle": "ai",
+    "artificial-intelligence": "ai",
+    "ml": "machine-learning",
+    "dev-ops": "devops",
+    "js": "javascript",
+    "ts": "typescript",
+    "k8s": "kubernetes",
+    "db": "database",
+    "databases": "database",
+    "base-de-donnees": "database",
+    "securite": "security",
+    "developpement": "development",
+    "dev": "development",
+    "outil": "tool",
+    "tools": "tool",
+    "librairie": "library",
+    "libraries": "library",
+    "tutoriel": "tutorial",
+    "tutorials": "tutorial",
+    "guides": "guide",
+    "repository": "repo",
+    "productivite": "productivity",
+}
+# Fichier JSON {"variante": "forme canonique"} qui complète / remplace les alias par défaut
+TAG_ALIASES_FILE = os.getenv("TAG_ALIASES_FILE")
+TAG_MAX_LENGTH = 50
+
+_SEPARATORS = re.compile(r"[\s_/]+")
+_INVALID = re.compile(r"[^a-z0-9+#.\-]")
+
+
+def _load_aliases() -> dict[str, str]:
+    aliases = dict(DEFAULT_ALIASES)
+    if TAG_ALIASES_FILE:
+        with open(TAG_ALIASES_FILE, encoding="utf-8") as f:
+            aliases.update({_clean(variant): _clean(tag) for variant, tag in json.load(f).items()})
+    return aliases
+
+
+def _clean(tag: str) -> str:
+    """Minuscules, sans accents, mots séparés par des tirets : "Base de Données" -> "base-de-donnees" """
+    tag = unicodedata.normalize("NFKD", str(tag).strip().lower().lstrip("#"))
+    tag = "".join(char for char in tag if not unicodedata.combining(char))
+    tag = _INVALID.sub("", _SEPARATORS.sub("-", tag))
+    return tag.strip("-.")[:TAG_MAX_LENGTH]
+
+
+ALIASES = _load_aliases()
+
+
+def normalize_tag(tag: str) -> str:
+    tag = _clean(tag)
+    return ALIASES.get(tag, tag)
+
+
+def normalize_tags(tags: list | None) -> list[str]:
+    """Formes canoniques, sans doublons ni tags vides, dans l'ordre d'origine"""
+    if not isinstance(tags, list):
+        return []
+    return list(dict.fromkeys(tag for tag in map(normalize_tag, tags) if tag))
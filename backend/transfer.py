@@ -0,0 +1,259 @@
+"""
+Export / import en masse de la base de liens, en NDJSON ou Parquet : l'export lit la table
+par curseur serveur (mémoire constante quelle que soit la taille), l'import écrit par paquets
+(COPY sous PostgreSQL, INSERT multi-lignes sinon) sans repasser par le scraping ni Gemini,
+puis vectorise chaque paquet pour la recherche sémantique
+"""
+import io
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+from typing import AsyncIterator, Iterator
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlmodel import Session, select
+
+import crud
+import embeddings
+import metrics
+import models
+import tagging
+import urls
+from database import async_engine, engine
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+PARQUET_AVAILABLE = pa is not None
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "2000"))
+# Corps Parquet gardé en mémoire jusqu'à cette taille, puis sur disque
+IMPORT_SPOOL_BYTES = 16 * 1024 * 1024
+MAX_REPORTED_ERRORS = 20
+
+EXPORT_FIELDS = list(models.LinkExport.model_fields)
+# Champs lus par embeddings.link_text
+EMBEDDED_FIELDS = ["url", "title", "description", "tags", "content"]
+
+if PARQUET_AVAILABLE:
+    PARQUET_SCHEMA = pa.schema([
+        ("url", pa.string()),
+        ("title", pa.string()),
+        ("description", pa.string()),
+        ("source", pa.string()),
+        ("resource_type", pa.string()),
+        ("canonical_url", pa.string()),
+        ("tags", pa.list_(pa.string())),
+        ("content", pa.string()),
+        ("content_hash", pa.string()),
+        ("created_at", pa.timestamp("us")),
+        ("refreshed_at", pa.timestamp("us")),
+        ("read", pa.bool_()),
+    ])
+
+
+# --- Export ---
+
+def _export_statement(since: datetime | None):
+    statement = select(*[getattr(models.Link, name) for name in EXPORT_FIELDS]).order_by(models.Link.id)
+    if since is not None:
+        statement = statement.where(models.Link.created_at >= since)
+    return statement
+
+
+async def export_rows(since: datetime | None = None) -> AsyncIterator[list[dict]]:
+    """Paquets de EXPORT_BATCH_SIZE lignes lus par curseur serveur (asyncpg) / curseur SQLite"""
+    async with async_engine.connect() as conn:
+        result = await conn.stream(_export_statement(since).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        async for partition in result.mappings().partitions(EXPORT_BATCH_SIZE):
+            yield [dict(row) for row in partition]
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+async def export_ndjson(since: datetime | None = None) -> AsyncIterator[bytes]:
+    exported = 0
+    async for rows in export_rows(since):
+        exported += len(rows)
+        yield "".join(json.dumps(row, default=_json_default, ensure_ascii=False) + "\n" for row in rows).encode()
+    metrics.log("export_finished", format="ndjson", links=exported)
+
+
+class _ParquetSink(io.RawIOBase):
+    """Fichier de sortie du ParquetWriter : les octets écrits sont repris après chaque row group"""
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._size += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._size
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+async def export_parquet(since: datetime | None = None) -> AsyncIterator[bytes]:
+    """Un row group par paquet, envoyé dès qu'il est écrit"""
+    sink = _ParquetSink()
+    writer = pq.ParquetWriter(sink, PARQUET_SCHEMA, compression="zstd")
+    exported = 0
+    try:
+        async for rows in export_rows(since):
+            columns = {name: [row[name] for row in rows] for name in PARQUET_SCHEMA.names}
+            writer.write_table(pa.Table.from_pydict(columns, schema=PARQUET_SCHEMA))
+            exported += len(rows)
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+    metrics.log("export_finished", format="parquet", links=exported)
+
+
+# --- Import ---
+
+class ImportReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.received = 0
+        self.created = 0
+        self.embedded = 0
+        self.invalid = 0
+        self.errors: list[dict] = []
+
+    def error(self, index: int, message: str):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"index": index, "error": message})
+
+    def add_batch(self, created: int, embedded: int):
+        self.created += created
+        self.embedded += embedded
+
+    def as_dict(self) -> dict:
+        return {
+            "received": self.received,
+            "created": self.created,
+            # Liens créés sans vecteur (échec de l'embedding) : rattrapés par `python -m embeddings`
+            "not_embedded": self.created - self.embedded,
+            "duplicates": self.received - self.created - self.invalid,
+            "invalid": self.invalid,
+            "errors": self.errors,
+            "seconds": round(time.perf_counter() - self.started, 3),
+        }
+
+
+def to_row(raw: object) -> dict:
+    """Ligne exportée -> colonnes de link ; lève ValueError / ValidationError si invalide"""
+    if not isinstance(raw, dict):
+        raise ValueError("Expected a JSON object")
+    link = models.LinkExport.model_validate(raw)
+    row = link.model_dump()
+    row["canonical_url"] = link.canonical_url or urls.normalize_url(link.url)
+    row["tags"] = tagging.normalize_tags(link.tags)
+    row["refreshed_at"] = link.refreshed_at or link.created_at
+    return row
+
+
+def insert_rows(rows: list[dict]) -> tuple[int, int]:
+    """Un paquet, une transaction : liens, linktag et compteurs de tags ; puis les vecteurs des liens créés.
+    Retourne (créés, vectorisés)"""
+    with metrics.span("db_insert", links=len(rows)), Session(engine) as session:
+        created = crud.import_links(session, rows)
+        crud.add_links_tags(session, [(link_id, tags) for link_id, tags, _ in created])
+        session.commit()
+    by_url = {row["canonical_url"]: row for row in rows}
+    embedded = embeddings.index.index_links_safely([
+        (link_id, embeddings.link_text(models.Link(**{name: by_url[canonical_url][name] for name in EMBEDDED_FIELDS})))
+        for link_id, _, canonical_url in created
+    ])
+    return len(created), embedded
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line
+    if buffer:
+        yield buffer
+
+
+async def import_ndjson(chunks: AsyncIterator[bytes]) -> dict:
+    """Lit le corps au fil de l'eau : au plus IMPORT_BATCH_SIZE lignes en mémoire"""
+    report = ImportReport()
+    pending: list[dict] = []
+    index = 0
+    async for line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        report.received += 1
+        try:
+            pending.append(to_row(json.loads(line)))
+        except (ValueError, ValidationError) as e:
+            report.error(index, str(e))
+        index += 1
+        if len(pending) >= IMPORT_BATCH_SIZE:
+            report.add_batch(*await run_in_threadpool(insert_rows, pending))
+            pending = []
+    if pending:
+        report.add_batch(*await run_in_threadpool(insert_rows, pending))
+    result = report.as_dict()
+    metrics.log("import_finished", format="ndjson", **{k: v for k, v in result.items() if k != "errors"})
+    return result
+
+
+def _parquet_records(file) -> Iterator[dict]:
+    for batch in pq.ParquetFile(file).iter_batches(batch_size=IMPORT_BATCH_SIZE):
+        yield from batch.to_pylist()
+
+
+def _import_parquet_file(file) -> dict:
+    report = ImportReport()
+    pending: list[dict] = []
+    for index, raw in enumerate(_parquet_records(file)):
+        report.received += 1
+        try:
+            pending.append(to_row(raw))
+        except (ValueError, ValidationError) as e:
+            report.error(index, str(e))
+        if len(pending) >= IMPORT_BATCH_SIZE:
+            report.add_batch(*insert_rows(pending))
+            pending = []
+    if pending:
+        report.add_batch(*insert_rows(pending))
+    return report.as_dict()
+
+
+async def import_parquet(chunks: AsyncIterator[bytes]) -> dict:
+    """Le pied de page Parquet est à la fin du fichier : le corps est d'abord mis de côté"""
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as file:
+        async for chunk in chunks:
+            file.write(chunk)
+        file.seek(0)
+        result = await run_in_threadpool(_import_parquet_file, file)
+    metrics.log("import_finished", format="parquet", **{k: v for k, v in result.items() if k != "errors"})
+    return result
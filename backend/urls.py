@@ -0,0 +1,58 @@
+"""
+Normalisation des URLs : une même page doit toujours donner la même URL canonique
+"""
+import re
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
+TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "mc_cid", "mc_eid", "ref_src"}
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def is_tracking_param(name: str) -> bool:
+    name = name.lower()
+    return name.startswith("utm_") or name in TRACKING_PARAMS
+
+
+def normalize_url(url: str) -> str:
+    """Schéma/hôte en minuscules, port par défaut, paramètres de tracking, fragment et slash final retirés.
+    Lève ValueError si l'URL est inexploitable (schéma autre que http/https, hôte vide, port invalide)"""
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS:
+        raise ValueError(f"unsupported scheme: {parts.scheme or '(none)'}")
+    host = (parts.hostname or "").lower()
+    if not host:
+        raise ValueError("missing host")
+    if ":" in host:
+        # IPv6 : hostname retire les crochets, indispensables dans le netloc
+        host = f"[{host}]"
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path) or "/"
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    query = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(name)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, path, urlencode(query, doseq=True), ""))
+
+
+def resolve_canonical(href: str, base_url: str) -> str | None:
+    """URL absolue de <link rel="canonical">, ou None si elle n'est pas exploitable"""
+    canonical = urljoin(base_url, href.strip())
+    if urlsplit(canonical).scheme not in ("http", "https"):
+        return None
+    try:
+        normalize_url(canonical)
+    except ValueError:  # hôte vide, port invalide : l'URL de la page reste la référence
+        return None
+    # Beaucoup de sites mal configurés pointent toutes leurs pages vers la page d'accueil
+    if urlsplit(canonical).path in ("", "/") and urlsplit(base_url).path not in ("", "/"):
+        return None
+    return canonical
@@ -1,20 +1,66 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord import app_commands
 import os
 from dotenv import load_dotenv
-import requests
+import aiohttp
 import re
+import asyncio
+import time
+
+from spool import Spool
 
 load_dotenv()
 
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 BACKEND_URL = os.getenv("BACKEND_URL")
 DISCORD_GUILD_ID = os.getenv("DISCORD_GUILD_ID")
+JOB_POLL_INTERVAL = 2
+JOB_TIMEOUT = 180
+# Per-request timeouts: a slow backend must never hold a command for minutes
+HTTP_TIMEOUT = float(os.getenv("BOT_HTTP_TIMEOUT", "10"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("BOT_HTTP_CONNECT_TIMEOUT", "5"))
+# Submissions the backend could not accept are kept here and retried in the background
+SPOOL_PATH = os.getenv("BOT_SPOOL_PATH", "spool.db")
+SPOOL_DRAIN_INTERVAL = float(os.getenv("BOT_SPOOL_DRAIN_INTERVAL", "15"))
+SPOOL_BACKOFF_BASE = float(os.getenv("BOT_SPOOL_BACKOFF_BASE", "10"))
+SPOOL_BACKOFF_MAX = float(os.getenv("BOT_SPOOL_BACKOFF_MAX", "600"))
+
+
+class BackendError(Exception):
+    """The backend answered but refused or failed the request (not worth retrying)."""
+
+
+class BackendUnavailable(Exception):
+    """The backend is down, timed out or returned a 5xx: the submission can be spooled."""
+
+
+class IngesterBot(commands.Bot):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.http_session: aiohttp.ClientSession | None = None
+        self.spool = Spool(SPOOL_PATH, backoff_base=SPOOL_BACKOFF_BASE, backoff_max=SPOOL_BACKOFF_MAX)
+
+    async def setup_hook(self):
+        # One pooled session for the whole bot (keep-alive towards the backend)
+        self.http_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        )
+        drain_spool.start()
+
+    async def close(self):
+        drain_spool.cancel()
+        if self.http_session is not None:
+            await self.http_session.close()
+        self.spool.close()
+        await super().close()
+
 
 intents = discord.Intents.default()
 intents.message_content = True
-bot = commands.Bot(command_prefix="/", intents=intents)
+bot = IngesterBot(command_prefix="/", intents=intents)
+# Keeps a reference to fire-and-forget tasks so they are not garbage-collected mid-flight
+background_tasks: set[asyncio.Task] = set()
 
 @bot.event
 async def on_ready():
@@ -25,6 +71,81 @@ async def on_ready():
     except Exception as e:
         print(f"❌ Failed to sync commands: {e}")
 
+async def backend_request(method: str, path: str, **kwargs):
+    """Sends a request to the backend and returns the decoded JSON body.
+
+    Full URL rather than ClientSession(base_url=...): an absolute path would drop a BACKEND_URL
+    path prefix (e.g. https://host/api)."""
+    try:
+        async with bot.http_session.request(method, f"{BACKEND_URL.rstrip('/')}{path}", **kwargs) as response:
+            if response.status >= 500:
+                raise BackendUnavailable(f"Backend returned {response.status}")
+            if response.status >= 400:
+                raise BackendError(f"{response.status}: {(await response.text())[:100]}")
+            return await response.json()
+    except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+        raise BackendUnavailable(f"Backend unreachable: {e!r}")
+
+async def submit_link(payload: dict) -> dict:
+    """Creates an ingest job; raises BackendUnavailable if it should be spooled."""
+    return await backend_request("POST", "/ingest/", json=payload)
+
+async def wait_for_job(job: dict) -> dict:
+    """Polls an ingest job until the backend has processed it and returns the saved link."""
+    deadline = time.monotonic() + JOB_TIMEOUT
+    while job["status"] not in ("done", "failed"):
+        if time.monotonic() > deadline:
+            raise BackendError(f"Ingest job {job['id']} is still {job['status']}, check /list later")
+        await asyncio.sleep(JOB_POLL_INTERVAL)
+        job = await backend_request("GET", f"/jobs/{job['id']}")
+
+    if job["status"] == "failed":
+        raise BackendError(job.get("error") or "Ingest failed")
+    return job["link"]
+
+async def spool_submission(interaction: discord.Interaction, payload: dict, error: Exception):
+    await bot.spool.put(payload, interaction.channel_id)
+    print(f"Backend unavailable ({error}), spooled {payload['url']}")
+    await interaction.followup.send(
+        f"⏳ Backend unavailable, link queued locally. It will be saved automatically: {payload['url']}"
+    )
+
+async def notify_channel(channel_id: int | None, message: str):
+    channel = bot.get_channel(channel_id) if channel_id else None
+    if channel is not None:
+        await channel.send(message)
+
+async def follow_spooled_job(entry: dict, job: dict):
+    """Reports the outcome of a spooled submission once its job is done."""
+    try:
+        link = await wait_for_job(job)
+        await notify_channel(entry["channel_id"], f"✅ Queued link saved!\nTitle: {link.get('title', 'N/A')}\nURL: {link['url']}")
+    except (BackendError, BackendUnavailable) as e:
+        await notify_channel(entry["channel_id"], f"❌ Error saving queued link {entry['payload']['url']}: {str(e)[:100]}")
+
+@tasks.loop(seconds=SPOOL_DRAIN_INTERVAL)
+async def drain_spool():
+    """Resubmits spooled links whose backoff has expired."""
+    for entry in await bot.spool.due():
+        try:
+            job = await submit_link(entry["payload"])
+        except BackendUnavailable:
+            # Backend still down: back off and keep the rest for the next round
+            await bot.spool.retry_later(entry)
+            break
+        except BackendError as e:
+            await bot.spool.remove(entry)
+            await notify_channel(entry["channel_id"], f"❌ Queued link rejected {entry['payload']['url']}: {str(e)[:100]}")
+            continue
+        await bot.spool.remove(entry)
+        task = asyncio.create_task(follow_spooled_job(entry, job))
+        background_tasks.add(task)
+        task.add_done_callback(background_tasks.discard)
+
+@drain_spool.before_loop
+async def before_drain_spool():
+    await bot.wait_until_ready()
+
 @bot.tree.command(name="add", description="Adds a new article/blog post to the knowledge base")
 async def add_slash(interaction: discord.Interaction, url: str):
     """Adds a new article/blog post to the knowledge base."""
@@ -33,13 +154,14 @@ async def add_slash(interaction: discord.Interaction, url: str):
         return
 
     await interaction.response.defer()
-    
+
+    payload = {"url": url, "source": "discord", "resource_type": "article"}
     try:
-        response = requests.post(f"{BACKEND_URL}/ingest/", json={"url": url, "source": "discord", "resource_type": "article"})
-        response.raise_for_status()
-        link = response.json()
+        link = await wait_for_job(await submit_link(payload))
         await interaction.followup.send(f"✅ Article saved!\nTitle: {link.get('title', 'N/A')}\nURL: {link['url']}")
-    except requests.RequestException as e:
+    except BackendUnavailable as e:
+        await spool_submission(interaction, payload, e)
+    except BackendError as e:
         await interaction.followup.send(f"❌ Error saving link: {str(e)[:100]}")
 
 @bot.tree.command(name="tool", description="Adds a tool/resource to the knowledge base")
@@ -50,32 +172,30 @@ async def tool_slash(interaction: discord.Interaction, url: str, description: st
         return
 
     await interaction.response.defer()
-    
+
+    payload = {
+        "url": url,
+        "source": "discord",
+        "resource_type": "resource"
+    }
+    if description:
+        payload["description"] = description
+
     try:
-        payload = {
-            "url": url, 
-            "source": "discord", 
-            "resource_type": "resource"
-        }
-        if description:
-            payload["description"] = description
-            
-        response = requests.post(f"{BACKEND_URL}/ingest/", json=payload)
-        response.raise_for_status()
-        link = response.json()
+        link = await wait_for_job(await submit_link(payload))
         await interaction.followup.send(f"✅ Tool saved!\nTitle: {link.get('title', 'N/A')}\nURL: {link['url']}")
-    except requests.RequestException as e:
+    except BackendUnavailable as e:
+        await spool_submission(interaction, payload, e)
+    except BackendError as e:
         await interaction.followup.send(f"❌ Error saving tool: {str(e)[:100]}")
 
 @bot.tree.command(name="list", description="Lists the last 10 links from the knowledge base")
 async def list_slash(interaction: discord.Interaction):
     """Lists the last 10 links from the knowledge base."""
     await interaction.response.defer()
-    
+
     try:
-        response = requests.get(f"{BACKEND_URL}/links/?limit=10")
-        response.raise_for_status()
-        links = response.json()
+        links = await backend_request("GET", "/links/", params={"limit": 10, "fields": "title,url"})
         if not links:
             await interaction.followup.send("No links found.")
             return
@@ -84,7 +204,7 @@ async def list_slash(interaction: discord.Interaction):
         for link in links:
             embed.add_field(name=link.get('title', 'No Title'), value=link['url'], inline=False)
         await interaction.followup.send(embed=embed)
-    except requests.RequestException as e:
+    except (BackendError, BackendUnavailable) as e:
         await interaction.followup.send(f"❌ Error fetching links: {str(e)[:100]}")
 
 @bot.tree.command(name="rf", description="Force push a link to the database")
@@ -95,38 +215,31 @@ async def rf_slash(interaction: discord.Interaction, url: str, title: str = None
         return
 
     await interaction.response.defer()
-    
-    try:
-        payload = {
-            "url": url,
-            "source": "discord",
-            "resource_type": "article"
-        }
-        
-        if title:
-            payload["title"] = title
-        
-        max_retries = 3
-        for attempt in range(max_retries):
-            try:
-                response = requests.post(
-                    f"{BACKEND_URL}/ingest/",
-                    json=payload,
-                    timeout=30
-                )
-                response.raise_for_status()
-                link = response.json()
-                await interaction.followup.send(f"✅ **Force inserted!**\nTitle: {link.get('title', 'N/A')}\nURL: {link['url']}")
-                return
-            except requests.RequestException as retry_error:
-                if attempt < max_retries - 1:
-                    await interaction.followup.send(f"⚠️ Attempt {attempt + 1} failed, retrying...")
-                    continue
-                else:
-                    raise retry_error
-                    
-    except requests.RequestException as e:
-        await interaction.followup.send(f"❌ Force push failed after 3 attempts: {str(e)[:100]}")
+
+    payload = {
+        "url": url,
+        "source": "discord",
+        "resource_type": "article"
+    }
+
+    if title:
+        payload["title"] = title
+
+    max_retries = 3
+    for attempt in range(max_retries):
+        try:
+            link = await wait_for_job(await submit_link(payload))
+            await interaction.followup.send(f"✅ **Force inserted!**\nTitle: {link.get('title', 'N/A')}\nURL: {link['url']}")
+            return
+        except BackendError as e:
+            if attempt < max_retries - 1:
+                await interaction.followup.send(f"⚠️ Attempt {attempt + 1} failed, retrying...")
+                continue
+            await interaction.followup.send(f"❌ Force push failed after 3 attempts: {str(e)[:100]}")
+        except BackendUnavailable as e:
+            # No point hammering a backend that is down: the spool retries with backoff
+            await spool_submission(interaction, payload, e)
+            return
 
 if __name__ == "__main__":
     bot.run(DISCORD_TOKEN)
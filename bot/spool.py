@@ -0,0 +1,87 @@
+"""
+Local on-disk spool for submissions the backend could not accept (down, timeout, 5xx).
+Entries are kept in a small SQLite file and retried with exponential backoff.
+"""
+import asyncio
+import json
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    payload TEXT NOT NULL,
+    channel_id INTEGER,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL
+)
+"""
+
+
+class Spool:
+    def __init__(self, path: str, backoff_base: float = 10, backoff_max: float = 600):
+        self.path = path
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+        # sqlite3 connections are not safe for concurrent use from several threads
+        self._lock = asyncio.Lock()
+
+    async def _run(self, fn, *args):
+        async with self._lock:
+            return await asyncio.to_thread(fn, *args)
+
+    def _put(self, payload: dict, channel_id: int | None):
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT INTO spool (payload, channel_id, next_attempt_at, created_at) VALUES (?, ?, ?, ?)",
+            (json.dumps(payload), channel_id, now + self.backoff_base, now),
+        )
+        self._conn.commit()
+        return cursor.lastrowid
+
+    def _due(self, limit: int):
+        rows = self._conn.execute(
+            "SELECT id, payload, channel_id, attempts FROM spool WHERE next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (time.time(), limit),
+        ).fetchall()
+        return [
+            {"id": row[0], "payload": json.loads(row[1]), "channel_id": row[2], "attempts": row[3]}
+            for row in rows
+        ]
+
+    def _retry_later(self, entry_id: int, attempts: int):
+        delay = min(self.backoff_max, self.backoff_base * 2 ** attempts)
+        self._conn.execute(
+            "UPDATE spool SET attempts = ?, next_attempt_at = ? WHERE id = ?",
+            (attempts, time.time() + delay, entry_id),
+        )
+        self._conn.commit()
+
+    def _remove(self, entry_id: int):
+        self._conn.execute("DELETE FROM spool WHERE id = ?", (entry_id,))
+        self._conn.commit()
+
+    def _size(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    async def put(self, payload: dict, channel_id: int | None = None) -> int:
+        return await self._run(self._put, payload, channel_id)
+
+    async def due(self, limit: int = 20) -> list[dict]:
+        return await self._run(self._due, limit)
+
+    async def retry_later(self, entry: dict):
+        await self._run(self._retry_later, entry["id"], entry["attempts"] + 1)
+
+    async def remove(self, entry: dict):
+        await self._run(self._remove, entry["id"])
+
+    async def size(self) -> int:
+        return await self._run(self._size)
+
+    def close(self):
+        self._conn.close()
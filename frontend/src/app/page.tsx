@@ -1,13 +1,15 @@
 "use client";
 
 import { useEffect, useState, useMemo } from "react";
-import { Link } from "@/types";
-import { getLinks, deleteLink } from "@/lib/api";
+import { Link, TagFacet } from "@/types";
+import { getLinks, getTags, deleteLink } from "@/lib/api";
 
 export default function Home() {
   const [links, setLinks] = useState<Link[]>([]);
+  const [tagFacets, setTagFacets] = useState<TagFacet[]>([]);
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [tagsError, setTagsError] = useState<string | null>(null);
 
   // state filtrage et recherche
   const [searchQuery, setSearchQuery] = useState("");
@@ -17,19 +19,42 @@ export default function Home() {
   >("all");
   const [sortBy, setSortBy] = useState<"date" | "title">("date");
 
+  // un échec de /tags ne bloque pas l'affichage des liens
+  const fetchTags = async () => {
+    try {
+      setTagFacets(await getTags());
+      setTagsError(null);
+    } catch (err) {
+      setTagsError("Failed to fetch tags");
+    }
+  };
+
   useEffect(() => {
+    fetchTags();
+  }, []);
+
+  // filtre par tags appliqué par le backend (au moins un des tags sélectionnés, comme avant) :
+  // les liens au-delà de la première page sont aussi trouvés
+  useEffect(() => {
+    let cancelled = false;
     async function fetchLinks() {
       try {
-        const fetchedLinks = await getLinks();
-        setLinks(fetchedLinks);
+        const fetchedLinks = await getLinks(selectedTags, "any");
+        if (!cancelled) {
+          setLinks(fetchedLinks);
+          setError(null);
+        }
       } catch (err) {
-        setError("Failed to fetch links");
+        if (!cancelled) setError("Failed to fetch links");
       } finally {
-        setLoading(false);
+        if (!cancelled) setLoading(false);
       }
     }
     fetchLinks();
-  }, []);
+    return () => {
+      cancelled = true;
+    };
+  }, [selectedTags]);
 
   const handleDelete = async (linkId: number) => {
     if (
@@ -40,18 +65,18 @@ export default function Home() {
         setLinks(links.filter((link) => link.id !== linkId));
       } catch (err) {
         alert("Erreur lors de la suppression");
+        return;
       }
+      // les compteurs de tags ont changé
+      fetchTags();
     }
   };
 
-  // tous les tags uniques
-  const allTags = useMemo(() => {
-    const tagsSet = new Set<string>();
-    links.forEach((link) => {
-      link.tags?.forEach((tag) => tagsSet.add(tag));
-    });
-    return Array.from(tagsSet).sort();
-  }, [links]);
+  // tags uniques, comptés côté backend (GET /tags)
+  const allTags = useMemo(
+    () => tagFacets.map((facet) => facet.name).sort(),
+    [tagFacets]
+  );
 
   const filteredLinks = useMemo(() => {
     let filtered = links;
@@ -67,13 +92,6 @@ export default function Home() {
       );
     }
 
-    // Filtre par tags
-    if (selectedTags.length > 0) {
-      filtered = filtered.filter((link) =>
-        selectedTags.some((tag) => link.tags?.includes(tag))
-      );
-    }
-
     // Filtrer par type de ressource
     if (resourceTypeFilter !== "all") {
       filtered = filtered.filter(
@@ -92,7 +110,7 @@ export default function Home() {
     });
 
     return filtered;
-  }, [links, searchQuery, selectedTags, resourceTypeFilter, sortBy]);
+  }, [links, searchQuery, resourceTypeFilter, sortBy]);
 
   const toggleTag = (tag: string) => {
     setSelectedTags((prev) =>
@@ -291,6 +309,11 @@ export default function Home() {
               </div>
             </div>
           )}
+          {tagsError && (
+            <p className="mt-8 pt-8 border-t-2 border-dashed border-gray-300 text-xs font-mono text-[var(--accent-primary)]">
+              {tagsError}
+            </p>
+          )}
         </div>
 
         {/* Results count */}
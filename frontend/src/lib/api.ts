@@ -1,15 +1,32 @@
-import { Link } from "@/types";
+import { Link, TagFacet } from "@/types";
 
 const API_URL = process.env.NEXT_PUBLIC_API_URL;
 
-export async function getLinks(): Promise<Link[]> {
-  const response = await fetch(`${API_URL}/links/`);
+// tags : filtrage côté backend, pas seulement sur la première page ;
+// "any" = liens portant au moins l'un des tags, "all" = tous
+export async function getLinks(
+  tags: string[] = [],
+  tagsMatch: "any" | "all" = "any"
+): Promise<Link[]> {
+  const params = new URLSearchParams();
+  tags.forEach((tag) => params.append("tags", tag));
+  if (tags.length > 0) params.set("tags_match", tagsMatch);
+  const query = params.toString();
+  const response = await fetch(`${API_URL}/links/${query ? `?${query}` : ""}`);
   if (!response.ok) {
     throw new Error("Failed to fetch links");
   }
   return response.json();
 }
 
+export async function getTags(): Promise<TagFacet[]> {
+  const response = await fetch(`${API_URL}/tags`);
+  if (!response.ok) {
+    throw new Error("Failed to fetch tags");
+  }
+  return response.json();
+}
+
 export async function deleteLink(linkId: number): Promise<void> {
   const response = await fetch(`${API_URL}/links/${linkId}`, {
     method: "DELETE",
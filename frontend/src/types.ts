@@ -8,3 +8,8 @@ export interface Link {
   created_at: string;
   resource_type: "article" | "resource";
 }
+
+export interface TagFacet {
+  name: string;
+  count: number;
+}